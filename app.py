@@ -1,10 +1,36 @@
 import streamlit as st
 import dataManipulation
+import frontService
+import profiling
+import warmup
 
 st.set_page_config(layout="wide")
+profiling.start_rerun()  # Opt-in via MK8_PROFILE=1 or ?profile=1
+warmup.start()  # Background data loading, started by the first session of the process
+warming = warmup.pending()
+if warming:
+    st.sidebar.caption(f"Warming up ({', '.join(warming)})")
+
+
+def wait_for(*stages):
+    """ Show the warm-up progress and rerun until the given stages have run """
+    # The page would otherwise block on the context lock or repeat the warm-up's work
+    pending = warmup.pending(*stages)
+    if pending:
+        st.info(f"Loading {', '.join(pending)} - the page will appear in a moment")
+        warmup.wait(timeout=1)
+        st.experimental_rerun()
 
 st.sidebar.write("Select an optimization method:")
-choice = st.sidebar.radio("", ("Optimize by Kart Selection", "Optimize by Stats"))
+choice = st.sidebar.radio(
+    "",
+    (
+        "Optimize by Kart Selection",
+        "Optimize by Stats",
+        "Optimize by Criteria Subset",
+        "Optimize by Weighted Score",
+    ),
+)
 
 # Streamlit title/subtitle
 row1_1, _, row1_2 = st.columns((1.75, 1.5, 1.5))
@@ -17,6 +43,7 @@ with row1_2:
 
 # Optimize by Kart Selection: Pareto optimizations based on selecting kart combos and recommending better ones based on a 13-way optimization
 if choice == "Optimize by Kart Selection":
+    wait_for("context")
     char_list, kart_list, wheel_list, glider_list = dataManipulation.get_options()
 
     st.sidebar.write("Select a character, kart, wheel, and glider:")
@@ -43,19 +70,54 @@ if choice == "Optimize by Kart Selection":
         st.dataframe(selected, width=20000)
 
     else:
+        layer, layers = dataManipulation.get_layer(char, kart, wheel, glider)
         st.write(
-            "Ths is not a pareto optimal combination. See below for a list of dominating combinations:"
+            f"Ths is not a pareto optimal combination - it is on layer {layer} of {layers} "
+            f"(layer 1 being the pareto optimal combinations). See below for a list of dominating combinations:"
         )
         dataManipulation.get_dominated(char, kart, wheel, glider)
 
+# Optimize by Criteria Subset: Pareto optimal combinations for any set of criteria, computed on demand
+elif choice == "Optimize by Criteria Subset":
+    wait_for("context")
+    criteria = st.sidebar.multiselect(
+        "Select any number of criteria for optimization:",
+        options=dataManipulation.CRITERIA,
+        default=["Weight", "Acceleration", "Mini-Turbo", "Ground Speed"],
+    )
+    epsilon = st.sidebar.slider(
+        "Approximation resolution (1 shows the exact front):", 1, 5, 1
+    )
+    st.header("Pareto Optimal Combinations for the Selected Criteria")
+    if criteria:
+        dataManipulation.show_front(criteria, epsilon)
+    else:
+        st.write("Select at least one criterion.")
+
+# Optimize by Weighted Score: best combinations for a weighted sum of stats within per-stat bounds
+elif choice == "Optimize by Weighted Score":
+    wait_for("context")
+    stat_ranges = dataManipulation.get_stat_ranges()
+    st.sidebar.write("Weight each stat and limit the range it may take:")
+    weights, bounds = {}, {}
+    for criterion in dataManipulation.CRITERIA:
+        low, high = stat_ranges[criterion]
+        with st.sidebar.expander(criterion):
+            weights[criterion] = st.slider(
+                "Weight", -5.0, 5.0, 0.0, 0.5, key=f"weight_{criterion}"
+            )
+            bounds[criterion] = st.slider(
+                "Range", low, high, (low, high), key=f"range_{criterion}"
+            )
+    k = st.sidebar.number_input("Number of results", 1, 500, 25)
+    st.header("Best Combinations by Weighted Score")
+    dataManipulation.show_query(weights, bounds, k)
+
 # Optimize by Stats: Pareto optimal combinations based on 3 unique criteria
 else:
     # Streamlit dropdown selection - updates all dropdowns on update such that you cannot select the same option for 2 or more dropdowns at once
-    @st.cache(
-        allow_output_mutation=True
-    )  # "Remember" output of a function based on input across reruns/adjusting values
-    def get_state():  # Retain state upon changing
-        return {}
+    def get_state():  # Retain state upon changing, separately for each session
+        return st.session_state
 
     def display_dropdowns():
         """Get unique options and corresponding index value for each dropdown (unique indices generated for each dropdown for each dropdown combination)"""
@@ -96,11 +158,11 @@ else:
 
     # Initialize state dictionary/sidebar dropdowns (empty lets you multiple selectboxes to the same variable as long as the indices are unique)
     if "coord_x" not in state:
-        state["coord_x"] = "Weight"
+        state["coord_x"] = warmup.DEFAULT_AXES[0]
     if "coord_y" not in state:
-        state["coord_y"] = "Acceleration"
+        state["coord_y"] = warmup.DEFAULT_AXES[1]
     if "coord_z" not in state:
-        state["coord_z"] = "On-road Traction"
+        state["coord_z"] = warmup.DEFAULT_AXES[2]
 
     st.sidebar.write("Select three criteria for optimization:")
     coord_x_placeholder = st.sidebar.empty()
@@ -124,6 +186,8 @@ else:
         input_changed = True
         display_dropdowns()
 
+    wait_for("context", "fronts", "plotting", "figures")
+
     # 2D Optimization - Read 2d pareto optimal coordinates and statistics and plot pairwise graphs of criteria for each character/kart combination
     st.header("2D Projection Pareto Optimal Combinations")
     col1, col2, col3 = st.columns(3)
@@ -158,3 +222,8 @@ with row2:
         pareto optimal combinations for the 3D data set with the corresponding statistics for each combination are provided."""
 
         """### Mike Colella, 2022"""
+
+# Profiling panel and log line for this rerun, when switched on
+profiling.show_panel(
+    profiling.finish_rerun(choice, {"Front cache": frontService.cache_info()})
+)
@@ -0,0 +1,251 @@
+import argparse
+import io
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import numpy as np
+import pandas as pd
+import dominanceIndex
+import warmup
+from dataContext import get_context
+from computeParetoPoints import CRITERIA, NAMES
+
+
+# Batch evaluation of loadouts against the shared data context - the same lookups the kart
+# selection page makes, but for a whole table of loadouts at once. Part names are mapped
+# to codes column by column and membership and dominator counts are computed for every
+# valid row in one pass
+def read_loadouts(text, fmt):
+    """ Loadout table from CSV or JSONL text with Character, Kart, Wheel, Glider columns """
+    if fmt == "jsonl":
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        loadouts = pd.DataFrame.from_records(records, columns=NAMES)
+    else:
+        loadouts = pd.read_csv(io.StringIO(text), dtype=str)
+    missing = [name for name in NAMES if name not in loadouts.columns]
+    if missing:
+        raise ValueError(f"Loadouts are missing the columns {', '.join(missing)}")
+    return loadouts[NAMES].fillna("").astype(str)
+
+
+def loadout_rows(loadouts):
+    """ Stats row id of each loadout, or -1 where a part name is unknown """
+    context = get_context()
+    codes = np.column_stack(
+        [
+            loadouts[name].str.strip().map(part_codes).fillna(-1).to_numpy(np.int64)
+            for name, part_codes in zip(NAMES, context["codes"])
+        ]
+    )
+    valid = (codes >= 0).all(axis=1)
+    rows = np.full(len(loadouts), -1, dtype=np.int64)
+    rows[valid] = np.ravel_multi_index(codes[valid].T, context["radix"])
+    return rows
+
+
+def parse_count(value, name):
+    """ Non-negative whole number from a JSON value or a query string """
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if (
+        isinstance(value, (int, np.integer))
+        and not isinstance(value, bool)
+        and value >= 0
+    ):
+        return int(value)
+    raise ValueError(f"{name} must be a non-negative whole number, not {value!r}")
+
+
+def evaluate(loadouts, dominators=0, stats=False):
+    """ One result record per loadout: row id, membership, dominator count and dominators """
+    # Membership and dominators both follow the 13D front of the kart selection page,
+    # where ties in all 13 stats are broken by the part names (see get_matrix). A loadout
+    # is pareto optimal exactly when no other combination dominates it
+    dominators = parse_count(dominators, "dominators")
+    context = get_context()
+    rows = loadout_rows(loadouts)
+    valid = rows >= 0
+    counts = np.zeros(len(rows), dtype=np.int64)
+    # Name ranks make every row distinct, so the rows at least as good in every column
+    # other than the loadout itself are exactly its dominators
+    counts[valid] = dominanceIndex.count_dominators(
+        context["ranked_dominance"], context["ranked"][rows[valid]], rows[valid]
+    )
+    names = context["stats"][NAMES]
+
+    results = []
+    for i, (row, loadout) in enumerate(zip(rows, loadouts.to_dict("records"))):
+        if row < 0:
+            unknown = [
+                name
+                for name, part_codes in zip(NAMES, context["codes"])
+                if loadout[name].strip() not in part_codes
+            ]
+            results.append({**loadout, "error": f"Unknown {', '.join(unknown)}"})
+            continue
+        result = {
+            **loadout,
+            "row": int(row),
+            "pareto": bool(context["pareto"][row]),
+            "dominated_by": int(counts[i]),
+        }
+        if stats:
+            result.update(zip(CRITERIA, context["matrix"][row].tolist()))
+        if dominators and counts[i]:
+            _, top = dominanceIndex.query_dominators(
+                context["ranked_dominance"],
+                context["ranked"][row],
+                dominators,
+                exclude=row,
+            )
+            result["dominators"] = names.iloc[top].astype(str).values.tolist()
+        results.append(result)
+    return results
+
+
+def write_results(results, fmt, out):
+    if fmt == "csv":
+        table = pd.DataFrame.from_records(results)
+        # Loadouts with unknown parts have no row, so keep the columns nullable integers
+        table = table.astype(
+            {
+                column: dtype
+                for column, dtype in (("row", "Int64"), ("dominated_by", "Int64"))
+                if column in table
+            }
+        )
+        if "dominators" in table:
+            table["dominators"] = table["dominators"].map(
+                lambda top: json.dumps(top) if isinstance(top, list) else ""
+            )
+        table.to_csv(out, index=False)
+    else:
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    return
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """ Local JSON API over evaluate """
+
+    # POST /evaluate takes a JSON body {"loadouts": [...], "dominators": k, "stats": bool},
+    # or CSV / JSONL loadouts as the body (Content-Type text/csv or application/x-ndjson)
+    # with the options as query params. GET /health reports readiness
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            # Not ready (503) until the warm-up has loaded the data context, and failed
+            # (500, with the error) if it could not
+            stage = warmup.status()["stages"].get("context", {})
+            if stage.get("state") == "failed":
+                self.send_json(500, {"status": "failed", "error": stage["error"]})
+                return
+            if stage.get("state") != "done":
+                self.send_json(503, {"status": "starting", **warmup.status()})
+                return
+            self.send_json(
+                200, {"status": "ok", "combinations": len(get_context()["matrix"])}
+            )
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        if path != "/evaluate":
+            self.send_json(404, {"error": "Not found"})
+            return
+        # The last value of a repeated query param wins
+        params = {name: values[-1] for name, values in parse_qs(query).items()}
+        content_type = self.headers.get("Content-Type", "application/json")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError(f"Invalid Content-Length {length}")
+            body = self.rfile.read(length).decode()
+            if content_type.startswith("text/csv"):
+                loadouts = read_loadouts(body, "csv")
+            elif content_type.startswith("application/x-ndjson"):
+                loadouts = read_loadouts(body, "jsonl")
+            else:
+                request = json.loads(body)
+                if "loadouts" not in request:
+                    raise ValueError('The request body needs a "loadouts" list')
+                params = {**params, **request}
+                loadouts = pd.DataFrame.from_records(request["loadouts"], columns=NAMES)
+                loadouts = loadouts.fillna("").astype(str)
+            results = evaluate(
+                loadouts,
+                parse_count(params.get("dominators", 0), "dominators"),
+                str(params.get("stats", "")).lower() in ("1", "true"),
+            )
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_json(400, {"error": str(error)})
+            return
+        self.send_json(200, {"results": results})
+
+
+def serve(host="127.0.0.1", port=8765):
+    """ Serve the batch queries as a local JSON HTTP API """
+    # The data loads in the background, so the server answers /health right away
+    warmup.start(("context",))
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Serving on http://{host}:{port} (POST /evaluate, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check loadouts for pareto optimality and list their dominators"
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-", help="CSV or JSONL loadouts (default: stdin)"
+    )
+    parser.add_argument("--output", default="-", help="results file (default: stdout)")
+    parser.add_argument(
+        "--format",
+        choices=("csv", "jsonl"),
+        help="input and output format (default: from the input file name, else csv)",
+    )
+    parser.add_argument(
+        "--dominators", type=int, default=0, help="dominators to list per loadout"
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="include the loadout's 13 stats"
+    )
+    parser.add_argument("--serve", action="store_true", help="run the HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    if args.dominators < 0:
+        parser.error("--dominators must be a non-negative whole number")
+
+    if args.serve:
+        serve(args.host, args.port)
+        sys.exit()
+    fmt = args.format or ("jsonl" if args.input.endswith(".jsonl") else "csv")
+    if args.input == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.input) as f:
+            text = f.read()
+    results = evaluate(read_loadouts(text, fmt), args.dominators, args.stats)
+    if args.output == "-":
+        write_results(results, fmt, sys.stdout)
+    else:
+        with open(args.output, "w", newline="") as f:
+            write_results(results, fmt, f)
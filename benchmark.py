@@ -0,0 +1,288 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = "MK8Data.csv"
+
+
+# Synthetic part tables - the character section is grown with jittered copies of the
+# real characters, so a table at scale s has s times as many combinations. New rows go
+# between the first and last character so split_parts still finds the section
+def synthetic_parts(data, scale, seed=0):
+    """ Part table with scale times as many distinct character stat lines """
+    rng = np.random.default_rng(seed)
+    data = data.dropna().drop_duplicates()
+    positions = [data.index.get_loc(name) for name in ("Mario", "Cat Peach")]
+    chars = data.iloc[positions[0] : positions[1] + 1]
+    target = int(round(len(chars) * scale)) - len(chars)
+    extra = pd.DataFrame(columns=data.columns, dtype=data.dtypes.iloc[0])
+    while len(extra) < target:
+        picks = chars.iloc[rng.integers(len(chars), size=target - len(extra))]
+        jitter = rng.integers(-1, 2, size=picks.shape)
+        lines = (picks.to_numpy() + jitter).clip(0, data.to_numpy().max())
+        extra = pd.concat([extra, pd.DataFrame(lines, columns=data.columns)])
+        # Parts with repeated stat lines would be dropped again by read_parts
+        extra = extra[~extra.apply(tuple, axis=1).isin(data.apply(tuple, axis=1))]
+        extra = extra.drop_duplicates().iloc[:target]
+    extra.index = [f"Synthetic Character {i}" for i in range(len(extra))]
+    extra.index.name = data.index.name
+    return pd.concat(
+        [data.iloc[: positions[0] + 1], extra, data.iloc[positions[0] + 1 :]]
+    )
+
+
+def measure(func, repeat, reset=None):
+    """ Wall times over repeat calls, then the peak traced memory of one more call """
+    # reset runs untimed before every call, so each call starts from cold caches
+    times = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, times, peak
+
+
+def benchmarks():
+    """ (name, call, front size of the result) for each measured function """
+    import computeParetoPoints as cpp
+
+    def loader(name):
+        # The loaders live with the Streamlit pages, so streamlit is only needed when
+        # they are benchmarked
+        return getattr(importlib.import_module("dataManipulation"), name)
+
+    def store_size(dim):
+        dim_store = cpp.frontStore.open_store()[dim]
+        return len(dim_store["rows"])
+
+    return [
+        ("get_stats", lambda: cpp.build_stats(cpp.read_parts()), len),
+        (
+            "simple_cull_2d",
+            lambda: cpp.simple_cull_2d("Weight", "Acceleration"),
+            lambda result: len(result[1]),
+        ),
+        (
+            "simple_cull_3d",
+            lambda: cpp.simple_cull_3d("Weight", "Acceleration", "Mini-Turbo"),
+            lambda result: len(result[1]),
+        ),
+        ("simple_cull_13d", cpp.simple_cull_13d, len),
+        (
+            "streaming_13d",
+            lambda: cpp.streaming_front_rows(
+                cpp.part_matrices(cpp.read_parts(), cpp.CRITERIA, ranked=True)
+            ),
+            lambda result: len(result[1]),
+        ),
+        ("export_2d", cpp.export_2d, lambda result: store_size(2)),
+        ("export_3d", cpp.export_3d, lambda result: store_size(3)),
+        ("export_13d", cpp.export_13d, lambda result: store_size(len(cpp.CRITERIA))),
+        (
+            "import_data_2d",
+            lambda: loader("import_data_2d")("Weight", "Acceleration"),
+            len,
+        ),
+        (
+            "import_data_3d",
+            lambda: loader("import_data_3d")("Weight", "Acceleration", "Mini-Turbo"),
+            lambda result: len(result[1]),
+        ),
+    ]
+
+
+def run_scale(repeat, functions=None):
+    """ Measure the benchmarks on the part table in the working directory """
+    import computeParetoPoints as cpp
+    import frontService
+
+    def reset():
+        # Drop the in-process caches, otherwise every call after the first only
+        # measures a cache lookup
+        cpp.get_stats.cache_clear()
+        cpp.frontStore.open_store.cache_clear()
+        frontService.clear()
+
+    combinations = int(
+        np.prod([len(part) for part in cpp.split_parts(cpp.read_parts())])
+    )
+    results = []
+    for name, func, size in benchmarks():
+        if functions and name not in functions:
+            continue
+        index_path = os.path.join(cpp.frontStore.STORE_PATH, "index.json")
+        if name.startswith("import_data") and not os.path.exists(index_path):
+            # The loaders read the exported store, so write it first without timing it
+            cpp.export_2d()
+            cpp.export_3d()
+        result, times, peak = measure(func, repeat, reset)
+        results.append(
+            {
+                "name": name,
+                "combinations": combinations,
+                "wall_s": min(times),
+                "wall_median_s": float(np.median(times)),
+                "peak_bytes": peak,
+                "front_size": size(result),
+            }
+        )
+        print(
+            f"  {name:16} {min(times) * 1000:9.1f} ms {peak / 2**20:8.1f} MiB "
+            f"{results[-1]['front_size']:8} optimal",
+            file=sys.stderr,
+        )
+    return results
+
+
+def run(scales, repeat, seed, functions=None):
+    """ Run each scale in a fresh process inside a scratch copy of the data """
+    data = pd.read_csv(os.path.join(REPO_PATH, DATA_FILE), index_col="Names")
+    results = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as scratch:
+            parts = data if scale == 1 else synthetic_parts(data, scale, seed)
+            parts.to_csv(os.path.join(scratch, DATA_FILE))
+            out_file = os.path.join(scratch, "results.json")
+            print(f"Scale {scale}:", file=sys.stderr)
+            subprocess.run(
+                [
+                    sys.executable,
+                    os.path.join(REPO_PATH, "benchmark.py"),
+                    "--run-scale",
+                    out_file,
+                    "--repeat",
+                    str(repeat),
+                ]
+                + (["--functions", *functions] if functions else []),
+                cwd=scratch,
+                # The result cache goes in the scratch directory too, not the user's
+                env={**os.environ, "MK8_CACHE_PATH": os.path.join(scratch, "cache")},
+                check=True,
+            )
+            with open(out_file) as f:
+                scale_results = json.load(f)
+            shutil.rmtree(os.path.join(scratch, "fronts"), ignore_errors=True)
+        for result in scale_results:
+            results.append({"scale": scale, **result})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_PATH,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """ Print wall time ratios against a baseline run and return the regressions """
+    with open(baseline_path) as f:
+        baseline = {
+            (result["scale"], result["name"]): result
+            for result in json.load(f)["results"]
+        }
+    regressions = []
+    print(f"Compared with {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["scale"], result["name"]))
+        if old is None:
+            continue
+        ratio = result["wall_s"] / old["wall_s"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(result)
+        elif result["front_size"] != old["front_size"]:
+            flag = "  FRONT SIZE CHANGED"
+            regressions.append(result)
+        print(
+            f"  x{result['scale']:<4} {result['name']:16} {old['wall_s'] * 1000:9.1f} -> "
+            f"{result['wall_s'] * 1000:9.1f} ms ({ratio:5.2f}x){flag}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pareto culls, exporters and front loaders"
+    )
+    parser.add_argument(
+        "--scales",
+        type=float,
+        nargs="+",
+        default=[1, 2, 5, 10],
+        help="part table sizes, as multiples of the combinations in MK8Data.csv",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed calls per function"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="synthetic table seed")
+    parser.add_argument(
+        "--output", default="benchmark.json", help="file to write the results to"
+    )
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="wall time ratio reported as a regression (default: 1.25)",
+    )
+    parser.add_argument(
+        "--functions", nargs="+", help="only run these benchmarks (default: all)"
+    )
+    parser.add_argument("--run-scale", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scale:
+        with open(args.run_scale, "w") as f:
+            json.dump(run_scale(args.repeat, args.functions), f)
+        sys.exit()
+
+    results = run(
+        [int(s) if s == int(s) else s for s in args.scales],
+        args.repeat,
+        args.seed,
+        args.functions,
+    )
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "repeat": args.repeat,
+                "seed": args.seed,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Wrote {len(results)} results to {args.output}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
@@ -1,135 +1,331 @@
-import streamlit as st
 import pandas as pd
+import numpy as np
 import itertools as it
+import argparse
+import os
+import time
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import frontStore
+import resultCache
+import dominanceIndex
+import profiling
 
+CRITERIA = [
+    "Weight",
+    "Acceleration",
+    "On-road Traction",
+    "Off-road Traction",
+    "Mini-Turbo",
+    "Ground Speed",
+    "Water Speed",
+    "Anti-gravity Speed",
+    "Air Speed",
+    "Ground Handling",
+    "Water Handling",
+    "Anti-gravity Handling",
+    "Air Handling",
+]
 
-@st.cache
+NAMES = ["Character", "Kart", "Wheel", "Glider"]
+
+
+def canonical_key(*criteria):
+    """ Order a criteria combination the way the exporters store it (CRITERIA order) """
+    return tuple(sorted(criteria, key=CRITERIA.index))
+
+
+# Pareto engine
+def unique_rows(points):
+    """ Same as np.unique(points, axis=0, return_inverse=True), via a faster lexsort """
+    order = np.lexsort(points.T[::-1])
+    ordered = points[order]
+    first = np.ones(len(points), dtype=bool)
+    first[1:] = (ordered[1:] != ordered[:-1]).any(axis=1)
+    inverse = np.empty(len(points), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return ordered[first], inverse
+
+
+def pareto_mask_2d(points):
+    """ O(n log n) staircase front for a unique (n, 2) array """
+    # Sort by x then y, both descending - a row survives only if its y beats every row
+    # before it, since all of those have at least as large an x
+    order = np.lexsort((-points[:, 1], -points[:, 0]))
+    y = points[order, 1]
+    best = np.maximum.accumulate(np.concatenate(([-np.inf], y[:-1])))
+    mask = np.zeros(len(points), dtype=bool)
+    mask[order[y > best]] = True
+    return mask
+
+
+def pareto_mask_3d(points):
+    """ O(n log n) sweep-line front for a unique (n, 3) array """
+    # Sweep by x descending (ties by y, z descending) while keeping the 2D (y, z) front
+    # of every row seen so far as a staircase with y ascending and z descending
+    order = np.lexsort((-points[:, 2], -points[:, 1], -points[:, 0]))
+    mask = np.zeros(len(points), dtype=bool)
+    stair_y, stair_z = [], []
+    for i in order:
+        y, z = points[i, 1], points[i, 2]
+        # The first step with y' >= y has the largest z' among all such steps
+        pos = bisect_left(stair_y, y)
+        if pos < len(stair_y) and stair_z[pos] >= z:
+            continue
+        mask[i] = True
+        # Drop the steps the new row covers (y' <= y and z' <= z) and insert it
+        end = bisect_right(stair_y, y)
+        start = end
+        while start > 0 and stair_z[start - 1] <= z:
+            start -= 1
+        stair_y[start:end] = [y]
+        stair_z[start:end] = [z]
+    return mask
+
+
+def dominated_by(points, others, block_size=64):
+    """ Mask of the rows of points that some row of others dominates """
+    if len(points) == 0 or len(others) == 0:
+        return np.zeros(len(points), dtype=bool)
+    # Repeated coordinates only need testing once
+    points, inverse = unique_rows(points)
+    others, _ = unique_rows(others)
+    dominated = np.zeros(len(points), dtype=bool)
+    for start in range(0, len(points), block_size):
+        block = points[start : start + block_size, None, :]
+        dominated[start : start + block_size] = (
+            (others[None, :, :] >= block).all(axis=2)
+            & (others[None, :, :] > block).any(axis=2)
+        ).any(axis=1)
+    return dominated[inverse]
+
+
+def pareto_mask(points, block_size=256):
+    """ Mask of the rows of a unique (n, d) array that no other row dominates """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    n = len(points)
+    mask = np.zeros(n, dtype=bool)
+    if n == 0:
+        return mask
+    if points.shape[1] == 1:
+        mask[np.argmax(points[:, 0])] = True
+        return mask
+    if points.shape[1] == 2:
+        return pareto_mask_2d(points)
+    if points.shape[1] == 3:
+        return pareto_mask_3d(points)
+    # Visit rows by descending stat total: a row can only be dominated by a distinct row
+    # with a strictly larger total, so each block only has to be tested against the front
+    # found so far and against itself
+    order = np.argsort(-points.sum(axis=1), kind="stable")
+    front = np.empty((0, points.shape[1]))
+    for start in range(0, n, block_size):
+        block_ind = order[start : start + block_size]
+        block = points[block_ind]
+        dominated = (front[None, :, :] >= block[:, None, :]).all(axis=2).any(axis=1)
+        within = (block[None, :, :] >= block[:, None, :]).all(axis=2)
+        np.fill_diagonal(within, False)
+        dominated |= within.any(axis=1)
+        mask[block_ind[~dominated]] = True
+        front = np.concatenate([front, block[~dominated]])
+    return mask
+
+
+def read_parts(path="MK8Data.csv"):
+    """ Read the part stat table, keeping one part per distinct stat line """
+    profiling.add_bytes(os.path.getsize(path))
+    data = pd.read_csv(path, index_col="Names").dropna()
+
+    # Remove all characters, karts, etc. that have exactly the same stats
+    return data.drop_duplicates(keep="first")
+
+
+# Equivalence classes - read_parts keeps one part per distinct stat line, so every stats
+# row also stands for the combinations of the parts that share its parts' stat lines. The
+# parts of each class are kept as a CSR table, members[offsets[i]:offsets[i + 1]] being
+# the parts represented by representatives[i], and only expanded for display
+def part_classes(path="MK8Data.csv"):
+    """ Representative part names and a CSR table of the parts each one stands for """
+    data = pd.read_csv(path, index_col="Names").dropna()
+    # Classes are numbered in order of first appearance, the order read_parts keeps
+    classes = data.groupby(list(data.columns), sort=False).ngroup().to_numpy()
+    return {
+        "representatives": data.index[~data.duplicated(keep="first")],
+        "offsets": np.concatenate(([0], np.cumsum(np.bincount(classes)))),
+        "members": data.index[np.argsort(classes, kind="stable")],
+    }
+
+
+def class_members(classes, part):
+    """ Names of the parts with the same stats as a representative part """
+    i = classes["representatives"].get_loc(part)
+    return classes["members"][classes["offsets"][i] : classes["offsets"][i + 1]]
+
+
+def split_parts(data):
+    """ Character, kart, wheel and glider sections of the part table """
+    return [
+        data.loc["Mario":"Cat Peach"],
+        data.loc["Standard Kart":"Tanooki Kart"],
+        data.loc["Standard":"Sponge"],
+        data.loc["Super Glider":],
+    ]
+
+
+# Loaded once per process and shared read-only by every caller, without hashing
+@profiling.cached(lru_cache(maxsize=None))
 def get_stats():
     """ Get combined statistics for each combination of character, kart, wheel, and glider """
-    # Import data
-    data = pd.read_csv(r"MK8Data.csv", index_col="Names").dropna()
+    return build_stats(read_parts())
 
-    # Remove all characters, karts, etc. that have exactly the same stats
-    data = data.drop_duplicates(keep="first")
 
-    # Get character names, kart names, etc.
-    karts = data.loc["Standard Kart":"Tanooki Kart"].T
-    chars = data.loc["Mario":"Cat Peach"].T
-    wheels = data.loc["Standard":"Sponge"].T
-    gliders = data.loc["Super Glider":].T
+def build_stats(data):
+    """ Combined statistics for every combination of the parts in a part table """
+    # Get character, kart, wheel and glider stats, one (parts, criteria) matrix per group
+    parts = split_parts(data)
+    chars, karts, wheels, gliders = [
+        part[CRITERIA].to_numpy(dtype=np.float64) for part in parts
+    ]
+
+    # Sum up all possible stat combinations in one broadcast, in the same order as
+    # it.product(chars, karts, wheels, gliders)
+    totals = (
+        chars[:, None, None, None]
+        + karts[None, :, None, None]
+        + wheels[None, None, :, None]
+        + gliders[None, None, None, :]
+    )
+    codes = np.indices(totals.shape[:-1]).reshape(len(parts), -1)
 
-    # Sum up all possible stat combinations and add separate columns for character, kart, etc.
-    char_list, kart_list, wheel_list, glider_list = list(
-        zip(*[name for name in it.product(chars, karts, wheels, gliders)])
+    # Name columns hold category codes into each group's part names
+    names = pd.DataFrame(
+        {
+            name: pd.Categorical.from_codes(code, categories=part.index)
+            for name, code, part in zip(NAMES, codes, parts)
+        }
+    )
+    stats = pd.concat(
+        [names, pd.DataFrame(totals.reshape(-1, len(CRITERIA)), columns=CRITERIA)],
+        axis=1,
     )
-    stat_list = [
-        (chars[name[0]] + karts[name[1]] + wheels[name[2]] + gliders[name[3]])
-        for name in it.product(chars, karts, wheels, gliders)
+    return stats
+
+
+def get_matrix(stats):
+    """ Float matrix of the 13 criteria followed by the sorted rank of each name column """
+    # The 13D cull has always compared whole rows, so the name columns take part in
+    # dominance in lexicographic order - encoding them as sorted ranks keeps the 13D front
+    # unchanged
+    ranks = [
+        pd.Categorical(stats[name], categories=sorted(stats[name].unique())).codes
+        for name in NAMES
     ]
-    names = [
-        (name[0] + "_" + name[1] + "_" + name[2] + "_" + name[3])
-        for name in it.product(chars, karts, wheels, gliders)
+    return np.column_stack([stats[CRITERIA].to_numpy(dtype=np.float64)] + ranks)
+
+
+def front_rows(points):
+    """ Unique pareto optimal coordinates of an (n, d) array and the rows that have them """
+    unique, inverse = unique_rows(points)
+    mask = pareto_mask(unique)
+    return unique[mask], np.flatnonzero(mask[inverse])
+
+
+# Factorized search - stats are additive over the character, kart, wheel and glider
+# groups, and a combination whose partial sum is dominated stays dominated once the same
+# remaining parts are added. Pruning each group to its own front and then folding the
+# groups in one at a time keeps every intermediate set at the size of a front instead of
+# the size of the product
+def factorized_front_rows(parts):
+    """ front_rows over every sum of one row from each (n_g, d) part matrix """
+    # Row ids follow it.product order over the groups, the same as get_stats()
+    points = np.zeros((1, parts[0].shape[1]))
+    codes = np.zeros((1, 0), dtype=np.int64)
+    for part in parts:
+        _, survivors = front_rows(part)
+        sums = points[:, None, :] + part[survivors][None, :, :]
+        points = sums.reshape(-1, part.shape[1])
+        codes = np.column_stack(
+            [
+                np.repeat(codes, len(survivors), axis=0),
+                np.tile(survivors, len(codes)),
+            ]
+        )
+        coords, keep = front_rows(points)
+        points, codes = points[keep], codes[keep]
+    rows = np.ravel_multi_index(codes.T, [len(part) for part in parts])
+    return coords, np.sort(rows)
+
+
+def part_matrices(data, criteria, ranked=False):
+    """ Per-group part stat matrices for the given criteria, as summed by build_stats """
+    parts = [
+        part[list(criteria)].to_numpy(dtype=np.float64) for part in split_parts(data)
     ]
-    stats = pd.DataFrame(dict(zip(names, stat_list))).T
-    stats["Character"] = char_list
-    stats["Kart"] = kart_list
-    stats["Wheel"] = wheel_list
-    stats["Glider"] = glider_list
-    stats = stats.reindex(
-        columns=[
-            "Character",
-            "Kart",
-            "Wheel",
-            "Glider",
-            "Weight",
-            "Acceleration",
-            "On-road Traction",
-            "Off-road Traction",
-            "Mini-Turbo",
-            "Ground Speed",
-            "Water Speed",
-            "Anti-gravity Speed",
-            "Air Speed",
-            "Ground Handling",
-            "Water Handling",
-            "Anti-gravity Handling",
-            "Air Handling",
-        ]
+    if ranked:
+        # Name rank columns as in get_matrix - each group only adds to its own column
+        for g, part in enumerate(split_parts(data)):
+            ranks = np.zeros((len(part), len(NAMES)))
+            ranks[:, g] = pd.Series(part.index).rank(method="min").to_numpy() - 1
+            parts[g] = np.column_stack([parts[g], ranks])
+    return parts
+
+
+# Streaming search - for part tables whose product does not fit in memory, combination
+# stats are generated in blocks of consecutive row ids straight from the part matrices
+# and each block's front is merged into a running archive of the front so far. Only one
+# block and the archive are ever held, and rows tied with an archived point are kept
+def stat_chunks(parts, chunk_size=2**16):
+    """ (row ids, summed stats) blocks over every sum of one row from each part matrix """
+    shape = [len(part) for part in parts]
+    total = int(np.prod(shape))
+    for start in range(0, total, chunk_size):
+        rows = np.arange(start, min(start + chunk_size, total))
+        codes = np.unravel_index(rows, shape)
+        yield rows, sum(part[code] for part, code in zip(parts, codes))
+
+
+def streaming_front_rows(parts, chunk_size=2**16):
+    """ Same result as factorized_front_rows, in memory bounded by chunk_size """
+    # An empty part group has no combinations, and so an empty front
+    coords = points = np.empty((0, parts[0].shape[1]))
+    rows = np.empty(0, dtype=np.int64)
+    for block_rows, block in stat_chunks(parts, chunk_size):
+        _, keep = front_rows(block)
+        points = np.concatenate([points, block[keep]])
+        rows = np.concatenate([rows, block_rows[keep]])
+        # The archive rows come first and are in order, so the row ids stay sorted
+        coords, keep = front_rows(points)
+        points, rows = points[keep], rows[keep]
+    return coords, rows
+
+
+def front_coords(combo, coords):
+    """ DataFrame of unique front coordinates, sorted by the first criterion """
+    return (
+        pd.DataFrame(coords, columns=list(combo))
+        .sort_values(combo[0], kind="stable")
+        .reset_index(drop=True)
     )
-    return stats
 
 
 # 2D optimization
 def simple_cull_2d(coord1, coord2):
     """ Algorithm to obtain pareto optimal coordinates for 2 dimensions """
     stats = get_stats()
-    inputPoints = stats[[coord1, coord2]].drop_duplicates().reset_index(drop=True)
-    candidateRowNr = 0
-    pareto_points = pd.DataFrame({coord1: [], coord2: []})
-    while True:
-        candidateRow = inputPoints.iloc[candidateRowNr]
-        inputPoints = inputPoints.drop([candidateRowNr]).reset_index(drop=True)
-        rowNr = 0
-        nonDominated = True
-        while len(inputPoints) != 0 and rowNr < len(inputPoints):
-            row = inputPoints.iloc[rowNr]
-            if (candidateRow >= row).all():
-                inputPoints = inputPoints.drop([rowNr]).reset_index(drop=True)
-            elif (row >= candidateRow).all():
-                nonDominated = False
-                rowNr += 1
-            else:
-                rowNr += 1
-        if nonDominated:
-            pareto_points = pareto_points.append([candidateRow], ignore_index=True)
-
-        if len(inputPoints) == 0:
-            break
-    coords = pareto_points.sort_values(coord1)
-    coords_renamed = coords.rename(columns={coord1: coord1, coord2: "Max " + coord2})
-    merged = stats.merge(coords_renamed, on=coord1)
-    stats_best = merged[merged[coord2] == merged["Max " + coord2]]
-    stats_best = stats_best.drop(columns="Max " + coord2).sort_values(coord1)
-    return coords, stats_best
-
-
-# Create MultiIndex DF for coords/stats and export to CSV
-def export_csv_2d():
-    """ Export simple cull algo results as CSV (2dCoords/Stats.csv) """
-    choices = [
-        "Weight",
-        "Acceleration",
-        "On-road Traction",
-        "Off-road Traction",
-        "Mini-Turbo",
-        "Ground Speed",
-        "Water Speed",
-        "Anti-gravity Speed",
-        "Air Speed",
-        "Ground Handling",
-        "Water Handling",
-        "Anti-gravity Handling",
-        "Air Handling",
-    ]
-    combs = [pair for pair in it.combinations(choices, 2)]
-    results = list(zip(*[simple_cull_2d(*name) for name in combs]))
-    coords_2d = results[0]
-    stats_best_2d = results[1]
-
-    coords_2d_dict = {choice: coord for choice, coord in zip(combs, coords_2d)}
-    stats_best_2d_dict = {choice: stat for choice, stat in zip(combs, stats_best_2d)}
-    coords_2d_df = pd.concat(
-        coords_2d_dict.values(),
-        keys=coords_2d_dict.keys(),
-        names=["Coord1", "Coord2", "Ind"],
-    )
-    coords_2d_df.to_csv("2dCoords.csv")
-    stats_best_2d_df = pd.concat(
-        stats_best_2d_dict.values(),
-        keys=stats_best_2d_dict.keys(),
-        names=["Coord1", "Coord2", "Ind"],
-    )
-    stats_best_2d_df.to_csv("2dStats.csv")
+    coords, rows = front_rows(stats[[coord1, coord2]].to_numpy(dtype=np.float64))
+    return front_coords((coord1, coord2), coords), rows
+
+
+def export_2d(path=frontStore.STORE_PATH):
+    """ Export the front of every criterion pair to the binary front store """
+    points = get_stats()[CRITERIA].to_numpy(dtype=np.float64)
+    fronts = {
+        pair: front_rows(points[:, [CRITERIA.index(choice) for choice in pair]])
+        for pair in it.combinations(CRITERIA, 2)
+    }
+    frontStore.write_store({2: fronts}, CRITERIA, path, read_parts())
     return
 
 
@@ -137,133 +333,385 @@ def export_csv_2d():
 def simple_cull_3d(coord1, coord2, coord3):
     """ Algorithm to obtain pareto optimal coordinates for 3 dimensions """
     stats = get_stats()
-    inputPoints = (
-        stats[[coord1, coord2, coord3]].drop_duplicates().reset_index(drop=True)
-    )
-    candidateRowNr = 0
-    pareto_points = pd.DataFrame({coord1: [], coord2: [], coord3: []})
-    while True:
-        candidateRow = inputPoints.iloc[candidateRowNr]
-        inputPoints = inputPoints.drop([candidateRowNr]).reset_index(drop=True)
-        rowNr = 0
-        nonDominated = True
-        while len(inputPoints) != 0 and rowNr < len(inputPoints):
-            row = inputPoints.iloc[rowNr]
-            if (candidateRow >= row).all():
-                inputPoints = inputPoints.drop([rowNr]).reset_index(drop=True)
-            elif (row >= candidateRow).all():
-                nonDominated = False
-                rowNr += 1
-            else:
-                rowNr += 1
-        if nonDominated:
-            pareto_points = pareto_points.append([candidateRow], ignore_index=True)
-
-        if len(inputPoints) == 0:
-            break
-    coords = pareto_points.sort_values(coord1)
-    coords_renamed = coords.rename(
-        columns={coord1: coord1, coord2: coord2, coord3: "Max " + coord3}
+    points = stats[[coord1, coord2, coord3]].to_numpy(dtype=np.float64)
+    coords, rows = front_rows(points)
+    return front_coords((coord1, coord2, coord3), coords), rows
+
+
+def export_3d(path=frontStore.STORE_PATH):
+    """ Export the front of every criterion triplet to the binary front store """
+    # A front only depends on the unordered triplet, so store each one once under its
+    # canonical key and let the loaders reorder columns for the requested axes
+    points = get_stats()[CRITERIA].to_numpy(dtype=np.float64)
+    fronts = {
+        triplet: front_rows(points[:, [CRITERIA.index(choice) for choice in triplet]])
+        for triplet in it.combinations(CRITERIA, 3)
+    }
+    frontStore.write_store({3: fronts}, CRITERIA, path, read_parts())
+    return
+
+
+def simple_cull_13d():
+    """ Algorithm to obtain the stats row ids of the pareto optimal combinations (13D) """
+    _, rows = factorized_front_rows(part_matrices(read_parts(), CRITERIA, ranked=True))
+    return rows
+
+
+def export_13d(path=frontStore.STORE_PATH):
+    """ Export the 13D front to the binary front store """
+    # The optimal rows are the coordinates, so only their ids are stored
+    no_coords = np.empty((0, len(CRITERIA)))
+    frontStore.write_store(
+        {len(CRITERIA): {tuple(CRITERIA): (no_coords, simple_cull_13d())}},
+        CRITERIA,
+        path,
+        read_parts(),
     )
-    merged = stats.merge(coords_renamed, on=[coord1, coord2])
-    stats_best = merged[merged[coord3] == merged["Max " + coord3]]
-    stats_best = stats_best.drop(columns="Max " + coord3).sort_values(coord1)
-    return coords, stats_best
-
-
-# Create MultiIndex DF for coords/stats and export to CSV
-def export_csv_3d():
-    """ Export simple cull algo results as CSV (3dCoords/Stats.csv) """
-    choices = [
-        "Weight",
-        "Acceleration",
-        "On-road Traction",
-        "Off-road Traction",
-        "Mini-Turbo",
-        "Ground Speed",
-        "Water Speed",
-        "Anti-gravity Speed",
-        "Air Speed",
-        "Ground Handling",
-        "Water Handling",
-        "Anti-gravity Handling",
-        "Air Handling",
+    export_ranks(get_matrix(get_stats()), path)
+    return
+
+
+# Pareto layers - the non-dominated sorting layer of every combination, under the same
+# 13D dominance as simple_cull_13d, so layer 1 is exactly the stored 13D front
+def export_ranks(matrix, path=frontStore.STORE_PATH):
+    """ Export the 13D pareto layer of every combination to the front store """
+    frontStore.write_ranks(dominanceIndex.layer_ranks(matrix), path)
+    return
+
+
+# Incremental update - a balance patch only changes the combinations that contain a
+# patched part, so each stored front is repaired instead of recomputed. Parts that are
+# added, patched or split off from a class of twins count as changed, so the rows of the
+# old and new tables are matched through the parts that kept their stats
+def repair_front(old_points, front, old_affected, new_points, new_affected, new_rows):
+    """ Front of new_points given the front of old_points and the rows that changed """
+    # new_rows maps every unaffected old row to its row in the new table
+    member = np.zeros(len(old_points), dtype=bool)
+    member[front] = True
+    lost = member & old_affected
+    # Every other unchanged row was dominated by an old front row. Rows that no changed
+    # front row dominated are still dominated by a kept one, so only the rest can enter
+    candidates = np.flatnonzero(~member & ~old_affected)
+    candidates = new_rows[
+        candidates[dominated_by(old_points[candidates], old_points[lost])]
     ]
-    combs = [triplet for triplet in it.permutations(choices, 3)]
-    results = list(zip(*[simple_cull_3d(*name) for name in combs]))
-    coords_3d = results[0]
-    stats_best_3d = results[1]
-
-    coords_3d_dict = {choice: coord for choice, coord in zip(combs, coords_3d)}
-    stats_best_3d_dict = {choice: stat for choice, stat in zip(combs, stats_best_3d)}
-    coords_3d_df = pd.concat(
-        coords_3d_dict.values(),
-        keys=coords_3d_dict.keys(),
-        names=["Coord1", "Coord2", "Coord3", "Ind"],
-    )
-    coords_3d_df.to_csv("3dCoords.csv")
-    stats_best_3d_df = pd.concat(
-        stats_best_3d_dict.values(),
-        keys=stats_best_3d_dict.keys(),
-        names=["Coord1", "Coord2", "Coord3", "Ind"],
+    kept = new_rows[member & ~old_affected]
+    changed = np.flatnonzero(new_affected)
+    changed = changed[front_rows(new_points[changed])[1]]
+
+    rows = np.concatenate([kept, candidates, changed])
+    # Kept rows still do not dominate each other, and a candidate that dominated one would
+    # make the old front row dominating the candidate dominate it too. So the kept rows,
+    # which are most of a high-dimensional front, are only tested against the changed
+    # front instead of being culled again
+    dominated = np.concatenate(
+        [
+            dominated_by(new_points[kept], new_points[changed]),
+            dominated_by(new_points[candidates], new_points[rows]),
+            dominated_by(new_points[changed], new_points[rows]),
+        ]
     )
-    stats_best_3d_df.to_csv("3dStats.csv")
-    return
+    rows = np.sort(rows[~dominated])
+    coords, _ = unique_rows(new_points[rows])
+    return coords, rows
 
 
-def simple_cull_13d():
-    """ Algorithm to obtain pareto optimal coordinates for all 13 criteria """
-    stats = get_stats()
-    inputPoints = stats.copy().drop_duplicates().reset_index(drop=True)
-    candidateRowNr = 0
-    choices = [
-        "Weight",
-        "Acceleration",
-        "On-road Traction",
-        "Off-road Traction",
-        "Mini-Turbo",
-        "Ground Speed",
-        "Water Speed",
-        "Anti-gravity Speed",
-        "Air Speed",
-        "Ground Handling",
-        "Water Handling",
-        "Anti-gravity Handling",
-        "Air Handling",
+def match_rows(old_parts, new_parts):
+    """ Changed rows of the old and new part tables and the new row of every other one """
+    old_groups, new_groups = split_parts(old_parts), split_parts(new_parts)
+    # Code of each new part in the old table, or -1 for a new or changed part
+    old_codes = []
+    for old, new in zip(old_groups, new_groups):
+        codes = old.index.get_indexer(new.index)
+        same = codes >= 0
+        same[same] = (old.to_numpy()[codes[same]] == new.to_numpy()[same]).all(axis=1)
+        old_codes.append(np.where(same, codes, -1))
+    old_radix = [len(group) for group in old_groups]
+    new_radix = [len(group) for group in new_groups]
+    mapped = [
+        codes[code]
+        for codes, code in zip(
+            old_codes, np.unravel_index(np.arange(np.prod(new_radix)), new_radix)
+        )
     ]
-    pareto_points = pd.DataFrame(columns=choices)
-    while True:
-        candidateRow = inputPoints.iloc[candidateRowNr]
-        inputPoints = inputPoints.drop([candidateRowNr]).reset_index(drop=True)
-        rowNr = 0
-        nonDominated = True
-        while len(inputPoints) != 0 and rowNr < len(inputPoints):
-            row = inputPoints.iloc[rowNr]
-            if (candidateRow >= row).all():
-                inputPoints = inputPoints.drop([rowNr]).reset_index(drop=True)
-            elif (row >= candidateRow).all():
-                nonDominated = False
-                rowNr += 1
+    new_affected = (np.array(mapped) < 0).any(axis=0)
+    new_rows = np.full(np.prod(old_radix), -1, dtype=np.int64)
+    new_rows[
+        np.ravel_multi_index([code[~new_affected] for code in mapped], old_radix)
+    ] = np.flatnonzero(~new_affected)
+    # Patched and added parts, then the parts that are gone
+    changed = [
+        name
+        for new, codes in zip(new_groups, old_codes)
+        for name in new.index[codes < 0]
+    ] + [
+        name
+        for old, new in zip(old_groups, new_groups)
+        for name in old.index.difference(new.index)
+    ]
+    return new_rows < 0, new_affected, new_rows, changed
+
+
+def update_fronts(path=frontStore.STORE_PATH, parts_path="MK8Data.csv"):
+    """ Bring the front store up to date with a patched part table """
+    start = time.perf_counter()
+    old_parts = read_parts(os.path.join(path, frontStore.PARTS_FILE))
+    new_parts = read_parts(parts_path)
+    if not old_parts.columns.equals(new_parts.columns):
+        print("The stat columns changed - rebuilding every front")
+        return export_parallel(force=True)
+    old_affected, new_affected, new_rows, changed = match_rows(old_parts, new_parts)
+    if not (old_affected.any() or new_affected.any()):
+        print("No stat changes - the fronts are up to date")
+        return
+
+    old_matrix = get_matrix(build_stats(old_parts))
+    new_matrix = get_matrix(build_stats(new_parts))
+    fronts = {}
+    for dim in frontStore.open_store(path):
+        fronts[dim] = {}
+        for combo in it.combinations(CRITERIA, dim):
+            if dim <= 3:
+                # The 2D and 3D sweeps run over the whole table in less time than it
+                # takes to work out which rows a repair has to look at
+                cols = [CRITERIA.index(choice) for choice in combo]
+                fronts[dim][combo] = front_rows(new_matrix[:, cols])
+                continue
+            _, front = frontStore.read_front(combo, path)
+            if dim == len(CRITERIA):
+                # The 13D front also ranks the name columns (see get_matrix). Added
+                # names shift the ranks but keep their order, so dominance between
+                # unchanged rows is the same in both tables
+                cols = slice(None)
             else:
-                rowNr += 1
-        if nonDominated:
-            pareto_points = pareto_points.append([candidateRow], ignore_index=True)
+                cols = [CRITERIA.index(choice) for choice in combo]
+            coords, rows = repair_front(
+                old_matrix[:, cols],
+                front,
+                old_affected,
+                new_matrix[:, cols],
+                new_affected,
+                new_rows,
+            )
+            if dim == len(CRITERIA):
+                coords = np.empty((0, len(CRITERIA)))
+            fronts[dim][combo] = (coords, rows)
+    frontStore.write_store(fronts, CRITERIA, path, new_parts)
+    if len(CRITERIA) in fronts:
+        # Layers below the front can shift anywhere, and a full sort is cheap
+        export_ranks(new_matrix, path)
+    print(
+        f"Patched {', '.join(changed)}: {new_affected.sum()} of {len(new_matrix)} "
+        f"combinations changed, fronts repaired in {time.perf_counter() - start:.2f} s"
+    )
+    return
+
+
+# Parallel export - every criterion combination is culled independently in a worker
+# process that reads the stats matrix from shared memory
+_worker_state = {}
+
+
+def combo_label(combo):
+    """ Short display name for a criterion combination """
+    return "All criteria" if len(combo) == len(CRITERIA) else " / ".join(combo)
+
+
+def front_name(combo, ranked=False):
+    """ File name stem of a criterion combination in the result cache """
+    # The exported 13D front also ranks the name columns, so it is cached apart from
+    # the plain 13D front of the criteria subset page
+    name = "front_" + "-".join(str(CRITERIA.index(choice)) for choice in combo)
+    return name + "_ranked" if ranked else name
+
+
+def _init_worker(shm_name, shape, ranked_parts):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_state["shm"] = shm
+    _worker_state["matrix"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker_state["ranked_parts"] = ranked_parts
+
+
+def _cull_worker(combo):
+    start = time.perf_counter()
+    if len(combo) == len(CRITERIA):
+        # The 13D front also ranks the name columns (see get_matrix). Folding the part
+        # groups beats culling the full ranked matrix, as in simple_cull_13d
+        coords, rows = factorized_front_rows(_worker_state["ranked_parts"])
+    else:
+        matrix = _worker_state["matrix"]
+        coords, rows = front_rows(
+            matrix[:, [CRITERIA.index(choice) for choice in combo]]
+        )
+    return combo, coords[:, : len(combo)], rows, time.perf_counter() - start
 
-        if len(inputPoints) == 0:
-            break
 
-    coords = pareto_points.sort_values("Weight")
-    return coords
+def export_parallel(max_workers=None, dims=(2, 3, 13), force=False):
+    """ Export the fronts for every combination of dims criteria across a process pool """
+    start = time.perf_counter()
+    parts = read_parts()
+    key = frontStore.content_key(parts, CRITERIA)
+    if (
+        not force
+        and frontStore.store_key() == key
+        and set(dims) <= set(frontStore.open_store())
+    ):
+        if len(CRITERIA) in dims and not os.path.exists(
+            os.path.join(frontStore.STORE_PATH, frontStore.RANKS_FILE)
+        ):
+            # A streamed export leaves the layers out, so they may be all that is missing
+            export_ranks(get_matrix(build_stats(parts)))
+            print("Exported the missing pareto layers")
+        print(f"The fronts are up to date (content key {key})")
+        return {}
+    matrix = get_matrix(get_stats())
 
+    # Fronts already in the result cache for this content key are not culled again
+    results = {}
+    timings = {}
+    combs = []
+    for combo in (combo for dim in dims for combo in it.combinations(CRITERIA, dim)):
+        name = front_name(combo, ranked=len(combo) == len(CRITERIA))
+        entry = None if force else resultCache.load(key, name)
+        if entry is None:
+            combs.append(combo)
+        else:
+            results[combo] = (entry["coords"], entry["rows"])
+    if results:
+        print(f"{len(results)} fronts read from the result cache")
+    # Longest jobs first - the 13D cull takes as long as all the others together, and
+    # queued last it would run alone on one core after the rest have finished
+    combs.sort(key=len, reverse=True)
 
-def export_csv_13d():
-    """ Export simple cull algo results as CSV (AllCoords.csv) """
-    coords_13d = simple_cull_13d()
-    coords_13d.to_csv("AllCoords.csv")
+    shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+    try:
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[:] = matrix
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(
+                shm.name,
+                matrix.shape,
+                part_matrices(parts, CRITERIA, ranked=True),
+            ),
+        ) as executor:
+            futures = [executor.submit(_cull_worker, combo) for combo in combs]
+            for done, future in enumerate(as_completed(futures), start=1):
+                combo, coords, rows, elapsed = future.result()
+                results[combo] = (coords, rows)
+                timings[combo] = elapsed
+                resultCache.save(
+                    key,
+                    front_name(combo, ranked=len(combo) == len(CRITERIA)),
+                    {"coords": coords, "rows": rows},
+                )
+                print(
+                    f"[{done}/{len(combs)}] {combo_label(combo)}: {elapsed * 1000:.1f} ms, "
+                    f"{len(rows)} optimal combinations"
+                )
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if len(CRITERIA) in dims:
+        # The optimal rows are the 13D coordinates, so only their ids are stored
+        rows = results[tuple(CRITERIA)][1]
+        results[tuple(CRITERIA)] = (np.empty((0, len(CRITERIA))), rows)
+    fronts = {
+        dim: {combo: results[combo] for combo in it.combinations(CRITERIA, dim)}
+        for dim in dims
+    }
+    frontStore.write_store(fronts, CRITERIA, parts=parts)
+    if len(CRITERIA) in dims:
+        export_ranks(matrix)
+
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:5]
+    print(
+        f"Culled {len(combs)} combinations in {time.perf_counter() - start:.2f} s "
+        f"({sum(timings.values()):.2f} s of worker time)"
+    )
+    for combo, elapsed in slowest:
+        print(f"  {elapsed * 1000:8.1f} ms  {combo_label(combo)}")
+    return timings
+
+
+def export_streaming(dims=(2, 3, 13), chunk_size=2**16, path=frontStore.STORE_PATH):
+    """ Export the fronts for every combination of dims criteria without the product """
+    start = time.perf_counter()
+    parts = read_parts()
+    fronts = {}
+    for dim in dims:
+        fronts[dim] = {}
+        for combo in it.combinations(CRITERIA, dim):
+            if dim == len(CRITERIA):
+                # The 13D front also ranks the name columns (see get_matrix), and only
+                # its row ids are stored
+                _, rows = streaming_front_rows(
+                    part_matrices(parts, combo, ranked=True), chunk_size
+                )
+                fronts[dim][combo] = (np.empty((0, dim)), rows)
+            else:
+                fronts[dim][combo] = streaming_front_rows(
+                    part_matrices(parts, combo), chunk_size
+                )
+    frontStore.write_store(fronts, CRITERIA, path, parts)
+    if len(CRITERIA) in dims:
+        # Layers need the ranked stats of every combination at once. They are assembled
+        # from the same blocks (get_matrix without the stats table), and layer_ranks
+        # works through them in chunks, so memory stays linear in the combinations
+        ranked = part_matrices(parts, CRITERIA, ranked=True)
+        export_ranks(
+            np.concatenate([block for _, block in stat_chunks(ranked, chunk_size)]),
+            path,
+        )
+    print(
+        f"Streamed {sum(len(dim_fronts) for dim_fronts in fronts.values())} fronts "
+        f"in blocks of {chunk_size} in {time.perf_counter() - start:.2f} s"
+    )
     return
 
 
 if __name__ == "__main__":
-    export_csv_2d()
-    export_csv_3d()
-    export_csv_13d()
+    parser = argparse.ArgumentParser(description="Export precomputed pareto fronts")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default: all cores)",
+    )
+    parser.add_argument(
+        "--serial", action="store_true", help="run the exporters in this process"
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="repair the stored fronts after a change to MK8Data.csv",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="generate the combinations in blocks instead of building them all at once "
+        "(the pareto layers still hold the ranked stats of every combination)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=2**16,
+        help="combinations per block with --stream (default: 65536)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="recompute every front, even when the store and result cache are current",
+    )
+    args = parser.parse_args()
+    if args.update:
+        update_fronts()
+    elif args.stream:
+        export_streaming(chunk_size=args.chunk_size)
+    elif args.serial:
+        export_2d()
+        export_3d()
+        export_13d()
+    else:
+        export_parallel(args.workers, force=args.force)
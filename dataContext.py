@@ -0,0 +1,119 @@
+import os
+import threading
+from types import MappingProxyType
+import numpy as np
+import frontStore
+import resultCache
+import dominanceIndex
+import statQuery
+import profiling
+from computeParetoPoints import (
+    build_stats,
+    get_matrix,
+    read_parts,
+    part_classes,
+    class_members,
+    CRITERIA,
+    NAMES,
+)
+
+DATA_FILE = "MK8Data.csv"
+
+# Everything the pages read is loaded once per process and shared by every session. The
+# context is a read-only mapping and its arrays are flagged read-only, so it is handed
+# out as is - nothing is hashed or copied per call the way st.cache does. It is reloaded
+# when the part table changes on disk, and everything derived from the part table is keyed
+# by its content key, so a patched table never meets results computed from the old one
+_state = {"context": None, "signature": None}
+_lock = threading.Lock()
+
+
+def freeze(value):
+    """ Flag the arrays in value (or in the dict value) read-only and return it """
+    arrays = value.values() if isinstance(value, dict) else [value]
+    for array in arrays:
+        if isinstance(array, np.ndarray):
+            array.setflags(write=False)
+    return value
+
+
+def load_context():
+    """ Stats, part classes, combination and query indexes and the front store """
+    parts = read_parts(DATA_FILE)
+    key = frontStore.content_key(parts, CRITERIA)
+    stats = build_stats(parts)
+    matrix = freeze(stats[CRITERIA].to_numpy(dtype=np.float64))
+    # The stats plus name rank columns that the 13D front and the layers are defined on
+    ranked = freeze(get_matrix(stats))
+    classes = part_classes(DATA_FILE)
+
+    # Stats rows are laid out in it.product(chars, karts, wheels, gliders) order, so a
+    # combination's row id is the mixed-radix number formed by its part codes. Parts
+    # with the same stats as a representative share its code
+    codes = tuple(
+        MappingProxyType(
+            {
+                member: code
+                for code, part in enumerate(stats[name].cat.categories)
+                for member in class_members(classes, part)
+            }
+        )
+        for name in NAMES
+    )
+
+    # The exported store is only used while it was computed from this part table,
+    # otherwise the layers come from the persistent result cache. Another process may
+    # have rewritten the store since it was last opened, so it is mapped afresh and its
+    # index is checked against the key
+    frontStore.open_store.cache_clear()
+    store = frontStore.open_store(key=key) if frontStore.store_key() else {}
+    store_current = len(store) > 0
+    if len(CRITERIA) in store and os.path.exists(
+        os.path.join(frontStore.STORE_PATH, frontStore.RANKS_FILE)
+    ):
+        ranks = frontStore.read_ranks()
+    else:
+        ranks = resultCache.get_or_build(
+            key,
+            "layers_13d",
+            lambda: {"ranks": dominanceIndex.layer_ranks(ranked)},
+        )["ranks"]
+    pareto = ranks == 1
+
+    return MappingProxyType(
+        {
+            "stats": stats,
+            "matrix": matrix,
+            "parts": parts,
+            "classes": MappingProxyType(freeze(classes)),
+            "codes": codes,
+            "radix": tuple(len(stats[name].cat.categories) for name in NAMES),
+            "pareto": freeze(pareto),
+            "ranks": ranks,
+            "layers": int(ranks.max()),
+            "ranked": ranked,
+            "dominance": MappingProxyType(freeze(dominanceIndex.build_index(matrix))),
+            "ranked_dominance": MappingProxyType(
+                freeze(dominanceIndex.build_index(ranked))
+            ),
+            "query": MappingProxyType(freeze(statQuery.build_query_index(matrix))),
+            "store": store,
+            "store_current": store_current,
+            "key": key,
+        }
+    )
+
+
+@profiling.timed
+def get_context():
+    """ The shared data context, loaded by the first session that asks for it """
+    profiling.count_cache("get_context", "calls")
+    stat = os.stat(DATA_FILE)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _state["signature"] != signature:
+        with _lock:
+            if _state["signature"] != signature:
+                profiling.count_cache("get_context", "misses")
+                _state["context"] = load_context()
+                _state["signature"] = signature
+    return _state["context"]
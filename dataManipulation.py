@@ -1,93 +1,190 @@
 import streamlit as st
+import json
 import pandas as pd
-from matplotlib import pyplot as plt
-import itertools as it
-import plotly.graph_objects as go
-from computeParetoPoints import get_stats
-
-# Import data/set page characteristics - cache for loadtime optimization
-@st.cache
-def df_to_dict_2d(df):
-    dict_2d = {
-        (a, b): (
-            v.reset_index().dropna(axis="columns").drop(columns=["Coord1", "Coord2"])
+import numpy as np
+from io import BytesIO
+import figureCache
+import dominanceIndex
+import frontService
+import statQuery
+import profiling
+from dataContext import get_context
+from computeParetoPoints import (
+    unique_rows,
+    class_members,
+    canonical_key,
+    CRITERIA,
+    NAMES,
+)
+
+
+# Fronts are kept once per unordered combination - look them up under the canonical key
+# and hand them back in the caller's axis order
+@profiling.timed
+def import_data_2d(coord1, coord2):
+    key = canonical_key(coord1, coord2)
+    coords, _ = frontService.get_front(*key)
+    return pd.DataFrame(
+        {coord: coords[:, key.index(coord)] for coord in (coord1, coord2)}
+    )
+
+
+@profiling.timed
+def import_data_3d(coord1, coord2, coord3):
+    key = canonical_key(coord1, coord2, coord3)
+    coords, rows = frontService.get_front(*key)
+    coords_df = pd.DataFrame(
+        {coord: coords[:, key.index(coord)] for coord in (coord1, coord2, coord3)}
+    )
+    return coords_df, rows
+
+
+# Tables list each combination once under its representative parts - parts with the same
+# stats are only spelled out for the rows actually shown
+def label_members(stats_df):
+    classes = get_context()["classes"]
+    labelled = stats_df.copy()
+    for name in NAMES:
+        labelled[name] = labelled[name].cat.rename_categories(
+            lambda part: ", ".join(class_members(classes, part))
         )
-        for (a, b), v in df.groupby(level=["Coord1", "Coord2"])
-    }
-    return dict_2d
+    return labelled
 
 
-@st.cache
-def df_to_dict_3d(df):
-    dict_3d = {
-        (a, b, c): (
-            v.reset_index()
-            .dropna(axis="columns")
-            .drop(columns=["Coord1", "Coord2", "Coord3"])
+def name_matches(rows, text):
+    """ Which rows have a part (or a part with the same stats) whose name contains text """
+    context = get_context()
+    classes = context["classes"]
+    text = text.casefold()
+    keep = np.zeros(len(rows), dtype=bool)
+    for name, codes in zip(NAMES, np.unravel_index(rows, context["radix"])):
+        matches = np.array(
+            [
+                any(
+                    text in member.casefold() for member in class_members(classes, part)
+                )
+                for part in context["stats"][name].cat.categories
+            ]
         )
-        for (a, b, c), v in df.groupby(level=["Coord1", "Coord2", "Coord3"])
-    }
-    return dict_3d
+        keep |= matches[codes]
+    return keep
 
 
-@st.cache
-def import_data_2d():
-    coords_2d_data = pd.read_csv(r"2dCoords.csv", index_col=[0, 1]).drop(columns="Ind")
-    coords_2d = df_to_dict_2d(coords_2d_data)
-    return coords_2d
+# Result tables only ever send one page to the browser. Sorting and filtering run here on
+# the row ids and the stats matrix, and only the rows of the visible page are turned into
+# a DataFrame
+def show_table(rows, columns, key, extra=None):
+    """ Paginated table of stats rows with server-side sort and part name filter """
+    context = get_context()
+    rows = np.asarray(rows)
+    extra = extra or {}
+    sort_col, order_col, filter_col, size_col, page_col = st.columns((2, 1, 2, 1, 1))
+    sort = sort_col.selectbox(
+        "Sort by", ["Default order"] + list(columns), key=f"{key}_sort"
+    )
+    descending = order_col.checkbox("Descending", True, key=f"{key}_descending")
+    text = filter_col.text_input("Filter by part name", "", key=f"{key}_filter")
+    size = size_col.selectbox("Rows per page", (25, 50, 100), key=f"{key}_size")
+    page = page_col.number_input("Page", min_value=1, value=1, key=f"{key}_page")
 
+    if text:
+        keep = np.flatnonzero(name_matches(rows, text))
+        rows = rows[keep]
+        extra = {name: np.asarray(values)[keep] for name, values in extra.items()}
+    pages = max(-(-len(rows) // size), 1)
+    start = (min(int(page), pages) - 1) * size
+    positions = statQuery.window(
+        context["query"],
+        rows,
+        None if sort == "Default order" else sort,
+        descending,
+        start,
+        size,
+    )
 
-@st.cache
-def import_data_3d():
-    coords_3d_data = pd.read_csv(r"3dCoords.csv", index_col=[0, 1, 2]).drop(
-        columns="Ind"
+    table = context["stats"].iloc[rows[positions]][NAMES + list(columns)]
+    for i, (name, values) in enumerate(extra.items()):
+        table.insert(len(NAMES) + i, name, np.asarray(values)[positions])
+    st.caption(
+        f"Rows {start + 1 if len(rows) else 0}-{start + len(positions)} of {len(rows)}"
+        f" (page {min(int(page), pages)} of {pages})"
     )
-    stats_3d_data = pd.read_csv(r"3dStats.csv", index_col=[0, 1, 2]).drop(columns="Ind")
-    coords_3d, stats_3d = df_to_dict_3d(coords_3d_data), df_to_dict_3d(stats_3d_data)
-    return coords_3d, stats_3d
+    st.dataframe(
+        label_members(table.reset_index(drop=True)),
+        width=2000,
+        height=30 * (len(table) + 1),
+    )
+    return
 
 
-def plot_2d(coord1, coord2):
-    stats = get_stats()
-    coords_2d = import_data_2d()
-    coords_proj = coords_2d[
-        [
-            pair
-            for pair in it.permutations((coord1, coord2), 2)
-            if pair in coords_2d.keys()
-        ][0]
-    ]
-    fig = plt.figure()
+# Many combinations share the same projected coordinates, so the background scatter
+# draws each distinct point once and scales its marker by how many combinations it holds
+def background_points(*coords):
+    """ Distinct projected stat points of all combinations and their multiplicities """
+    matrix = get_context()["matrix"]
+    unique, inverse = unique_rows(
+        matrix[:, [CRITERIA.index(coord) for coord in coords]]
+    )
+    return unique, np.bincount(inverse, minlength=len(unique))
+
+
+def marker_sizes(counts, smallest, largest):
+    """ Marker sizes growing linearly with multiplicity between smallest and largest """
+    return smallest + (largest - smallest) * (counts - 1) / max(counts.max() - 1, 1)
+
+
+def render_2d(coord1, coord2):
+    """ PNG bytes of the 2D projection with its pareto front """
+    # Plotting libraries are only imported by the pages that draw (or by the warm-up)
+    from matplotlib.figure import Figure
+
+    points, counts = background_points(coord1, coord2)
+    coords_proj = import_data_2d(coord1, coord2)
+    # A bare Figure is never registered with pyplot, so it is freed with its last
+    # reference instead of piling up in pyplot's figure list
+    fig = Figure()
     ax = fig.add_subplot(111, xlabel=coord1, ylabel=coord2)
-    ax.scatter(stats[coord1], stats[coord2])
+    ax.scatter(points[:, 0], points[:, 1], s=marker_sizes(counts, 8, 160), alpha=0.6)
     ax.plot(coords_proj[coord1], coords_proj[coord2], c="black")
     ax.scatter(coords_proj[coord1], coords_proj[coord2], c="black")
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", dpi=150)
+    return buffer.getvalue()
+
+
+def figure_2d(coord1, coord2):
+    """ Cached PNG bytes of a 2D projection """
+    return figureCache.get_figure(
+        ("2d", get_context()["key"], coord1, coord2), lambda: render_2d(coord1, coord2)
+    )
+
+
+@profiling.timed
+def plot_2d(coord1, coord2):
+    png = figure_2d(coord1, coord2)
     st.write(f"{coord1} vs. {coord2}")
-    st.pyplot(fig)
+    st.image(png)
     return
 
 
-def plot_3d(coord1, coord2, coord3):
-    stats = get_stats()
-    coords_3d, stats_3d = import_data_3d()
-    ind = [
-        triplet
-        for triplet in it.permutations((coord1, coord2, coord3), 3)
-        if triplet in coords_3d.keys()
-    ][0]
-    coords_df = coords_3d[ind]
-    stats_df = stats_3d[ind]
+def render_3d(coord1, coord2, coord3):
+    """ Plotly JSON of the 3D front surface over the combination point cloud """
+    import plotly.graph_objects as go
+
+    points, counts = background_points(coord1, coord2, coord3)
+    coords_df, _ = import_data_3d(coord1, coord2, coord3)
     fig_3d = go.Figure()
     fig_3d.add_trace(
         go.Mesh3d(x=coords_df[coord1], y=coords_df[coord2], z=coords_df[coord3])
     )
     fig_3d.add_trace(
         go.Scatter3d(
-            x=stats[coord1],
-            y=stats[coord2],
-            z=stats[coord3],
+            x=points[:, 0],
+            y=points[:, 1],
+            z=points[:, 2],
             mode="markers",
-            marker=dict(size=4, color="black", opacity=0.5),
+            marker=dict(size=marker_sizes(counts, 3, 12), color="black", opacity=0.5),
+            text=[f"{count} combinations" for count in counts],
         )
     )
     fig_3d.update_layout(
@@ -95,101 +192,140 @@ def plot_3d(coord1, coord2, coord3):
         height=750,
         width=750,
     )
+    return fig_3d.to_json().encode()
+
+
+def figure_3d(coord1, coord2, coord3):
+    """ Cached Plotly JSON of a 3D front """
+    return figureCache.get_figure(
+        ("3d", get_context()["key"], coord1, coord2, coord3),
+        lambda: render_3d(coord1, coord2, coord3),
+    )
+
+
+@profiling.timed
+def plot_3d(coord1, coord2, coord3):
+    matrix = get_context()["matrix"]
+    payload = figure_3d(coord1, coord2, coord3)
+    _, rows = import_data_3d(coord1, coord2, coord3)
+    rows = rows[np.argsort(matrix[rows, CRITERIA.index(coord1)], kind="stable")]
     st.write(f"{coord1} vs. {coord2} vs. {coord3}")
-    st.plotly_chart(fig_3d)
+    # st.plotly_chart validates the figure itself, so hand it the decoded dict
+    st.plotly_chart(json.loads(payload))
     st.write("Optmized character/kart combinations for the selected criteria")
-    st.dataframe(
-        stats_df[["Character", "Kart", "Wheel", "Glider", coord1, coord2, coord3]],
-        width=2000,
-        height=30 * len(stats),
+    show_table(rows, [coord1, coord2, coord3], "front_3d")
+    return
+
+
+# The stats row id of a combination is the mixed-radix number formed by its part codes
+def get_combination_id(char, kart, wheel, glider):
+    context = get_context()
+    row = 0
+    for part_codes, radix, part in zip(
+        context["codes"], context["radix"], (char, kart, wheel, glider)
+    ):
+        row = row * radix + part_codes[part]
+    return row
+
+
+@profiling.timed
+def show_front(criteria, epsilon=1):
+    matrix = get_context()["matrix"]
+    coords, rows = frontService.get_front(*criteria)
+    st.write(
+        f"{len(rows)} of {len(matrix)} combinations ({len(coords)} distinct stat lines) "
+        "are pareto optimal for the selected criteria"
     )
+    if len(criteria) == len(CRITERIA):
+        st.write(
+            "Combinations tied in every stat are all optimal here, while the kart "
+            "selection page breaks such ties by part name."
+        )
+    if epsilon > 1:
+        # Stats are whole numbers, so boxes of side 1 would give back the exact front
+        rows, quality = frontService.get_approximate_front(*criteria, epsilon=epsilon)
+        # Hypervolume is exact up to 3 criteria and a Monte Carlo estimate above that
+        error = quality["hypervolume_error"] / max(quality["exact_hypervolume"], 1e-12)
+        margin = f" (±{error:.1%})" if error else ""
+        st.write(
+            f"Showing {len(rows)} representatives, one per {epsilon}-wide stat box. Every "
+            f"optimal combination is within {quality['additive_epsilon']:g} of one of them "
+            f"in each stat; they keep {quality['hypervolume_ratio']:.1%} of the front's "
+            f"hypervolume{margin} and cover {quality['coverage']:.1%} of its "
+            "stat lines exactly."
+        )
+    # Best first on the first criterion, then on each following one
+    columns = [CRITERIA.index(criterion) for criterion in criteria]
+    rows = rows[np.lexsort([-matrix[rows, j] for j in reversed(columns)])]
+    show_table(rows, list(criteria), "front")
     return
 
 
+def get_stat_ranges():
+    values = get_context()["query"]["sorted"]
+    return {
+        criterion: (int(column[0]), int(column[-1]))
+        for criterion, column in zip(CRITERIA, values)
+    }
+
+
+@profiling.timed
+def show_query(weights, bounds, k):
+    stat_ranges = get_stat_ranges()
+    # Full-range sliders are no constraint at all
+    bounds = {
+        criterion: (low, high)
+        for criterion, (low, high) in bounds.items()
+        if (low, high) != stat_ranges[criterion]
+    }
+    rows, scores, matched = statQuery.query(get_context()["query"], weights, bounds, k)
+    st.write(
+        f"{matched} combinations satisfy the selected ranges - showing the best "
+        f"{len(rows)} by weighted score"
+    )
+    show_table(rows, CRITERIA, "query", extra={"Score": scores})
+    return
+
+
+@profiling.timed
 def get_selected_pareto(char, kart, wheel, glider):
-    pareto = pd.read_csv(r"AllCoords.csv")
-    selected = pareto[
-        (pareto["Character"] == char)
-        & (pareto["Kart"] == kart)
-        & (pareto["Wheel"] == wheel)
-        & (pareto["Glider"] == glider)
-    ]
-    selected = selected[
-        [
-            "Weight",
-            "Acceleration",
-            "On-road Traction",
-            "Off-road Traction",
-            "Mini-Turbo",
-            "Ground Speed",
-            "Water Speed",
-            "Anti-gravity Speed",
-            "Air Speed",
-            "Ground Handling",
-            "Water Handling",
-            "Anti-gravity Handling",
-            "Air Handling",
-        ]
-    ]
-    return selected
+    context = get_context()
+    row = get_combination_id(char, kart, wheel, glider)
+    if not context["pareto"][row]:
+        return pd.DataFrame(columns=CRITERIA)
+    return pd.DataFrame(context["matrix"][row : row + 1], columns=CRITERIA)
+
+
+@profiling.timed
+def get_layer(char, kart, wheel, glider):
+    # Pareto layer of the combination (1 being the front) and the number of layers
+    context = get_context()
+    row = get_combination_id(char, kart, wheel, glider)
+    return int(context["ranks"][row]), context["layers"]
 
 
+@profiling.timed
 def get_options():
-    stats = get_stats()
-    char_list = stats["Character"].unique()
-    kart_list = stats["Kart"].unique()
-    wheel_list = stats["Wheel"].unique()
-    glider_list = stats["Glider"].unique()
+    # Every part is selectable, including those that share stats with another part
+    char_list, kart_list, wheel_list, glider_list = [
+        list(part_codes) for part_codes in get_context()["codes"]
+    ]
     return char_list, kart_list, wheel_list, glider_list
 
 
+@profiling.timed
 def get_dominated(char, kart, wheel, glider):
-    stats = get_stats()
-    selected = stats[
-        (stats["Character"] == char)
-        & (stats["Kart"] == kart)
-        & (stats["Wheel"] == wheel)
-        & (stats["Glider"] == glider)
-    ]
-    stats = stats.drop(selected.index)
-    stats_numeric = stats[
-        [
-            "Weight",
-            "Acceleration",
-            "On-road Traction",
-            "Off-road Traction",
-            "Mini-Turbo",
-            "Ground Speed",
-            "Water Speed",
-            "Anti-gravity Speed",
-            "Air Speed",
-            "Ground Handling",
-            "Water Handling",
-            "Anti-gravity Handling",
-            "Air Handling",
-        ]
-    ]
-    selected = selected[
-        [
-            "Weight",
-            "Acceleration",
-            "On-road Traction",
-            "Off-road Traction",
-            "Mini-Turbo",
-            "Ground Speed",
-            "Water Speed",
-            "Anti-gravity Speed",
-            "Air Speed",
-            "Ground Handling",
-            "Water Handling",
-            "Anti-gravity Handling",
-            "Air Handling",
-        ]
-    ].reset_index(drop=True)
-    dominated = stats[(stats_numeric >= selected.squeeze()).all(1)].reset_index(
-        drop=True
+    context = get_context()
+    row = get_combination_id(char, kart, wheel, glider)
+    # Dominators come back ordered by descending stat total
+    count, rows = dominanceIndex.query_dominators(
+        context["dominance"],
+        context["matrix"][row],
+        len(context["matrix"]),
+        exclude=row,
     )
-    st.dataframe(dominated, width=20000, height=30 * len(stats))
+    st.write(f"{count} combinations dominate this one.")
+    show_table(rows, CRITERIA, "dominated")
     return
 
 
@@ -0,0 +1,115 @@
+import numpy as np
+
+# Set bits in each byte value, for counting packed bitsets
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+
+# Rows are renumbered by descending stat total before packing, so the first set bits of
+# a query are also its best matches and top-k never has to visit the rest
+def build_index(points):
+    """ Per-criterion threshold bitsets over the rows of an (n, d) array """
+    # bitsets[j, t] has bit i set if row i has criterion j >= values[j, t]; values are
+    # padded with +inf so that thresholds above every row select an empty bitset
+    points = np.asarray(points, dtype=np.float64)
+    order = np.argsort(-points.sum(axis=1), kind="stable")
+    ordered = points[order]
+    column_values = [np.unique(column) for column in ordered.T]
+    width = max(len(unique) for unique in column_values) + 1
+    values = np.full((points.shape[1], width), np.inf)
+    for j, unique in enumerate(column_values):
+        values[j, : len(unique)] = unique
+    bitsets = np.packbits(ordered.T[:, None, :] >= values[:, :, None], axis=2)
+    position = np.empty(len(points), dtype=np.int64)
+    position[order] = np.arange(len(points))
+    return {"order": order, "position": position, "values": values, "bitsets": bitsets}
+
+
+def dominator_bits(index, point, exclude=None):
+    """ Packed bitset of the rows that are at least as good as point in every criterion """
+    values = index["values"]
+    thresholds = (values < np.asarray(point, dtype=np.float64)[:, None]).sum(axis=1)
+    bits = np.bitwise_and.reduce(
+        index["bitsets"][np.arange(len(values)), thresholds], axis=0
+    )
+    if exclude is not None:
+        position = index["position"][exclude]
+        bits[position >> 3] &= ~np.uint8(0x80 >> (position & 7))
+    return bits
+
+
+def query_dominators(index, point, k, exclude=None):
+    """ Number of rows that dominate point and the ids of the (at most) k best of them """
+    bits = dominator_bits(index, point, exclude)
+    nonzero = np.flatnonzero(bits)
+    counts = np.cumsum(POPCOUNT[bits[nonzero]])
+    count = int(counts[-1]) if len(counts) else 0
+    # Only unpack as many leading non-empty bytes as it takes to reach k rows
+    nonzero = nonzero[: np.searchsorted(counts, k) + 1]
+    byte, bit = np.nonzero(np.unpackbits(bits[nonzero]).reshape(-1, 8))
+    positions = (nonzero[byte] * 8 + bit)[:k]
+    return count, index["order"][positions]
+
+
+def dominator_bit_rows(index, points, exclude=None):
+    """ dominator_bits of every row of an (m, d) array of points, as (m, bytes) """
+    points = np.asarray(points, dtype=np.float64)
+    values = index["values"]
+    thresholds = (values[None, :, :] < points[:, :, None]).sum(axis=2)
+    # One criterion at a time, so only (m, bytes) is ever held
+    bits = index["bitsets"][0, thresholds[:, 0]]
+    for j in range(1, len(values)):
+        bits &= index["bitsets"][j, thresholds[:, j]]
+    if exclude is not None:
+        position = index["position"][exclude]
+        bits[np.arange(len(points)), position >> 3] &= ~(
+            np.uint8(0x80) >> (position & 7).astype(np.uint8)
+        )
+    return bits
+
+
+def count_dominators(index, points, exclude=None, chunk_size=1024):
+    """ Number of rows at least as good as each point, for an (m, d) array of points """
+    counts = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), chunk_size):
+        bits = dominator_bit_rows(
+            index,
+            points[start : start + chunk_size],
+            None if exclude is None else exclude[start : start + chunk_size],
+        )
+        counts[start : start + chunk_size] = POPCOUNT[bits].sum(axis=1)
+    return counts
+
+
+# Non-dominated sorting - a row's layer is one more than the deepest layer among the rows
+# that dominate it. Each layer is every unassigned row whose dominators are all assigned
+# already, found with a single AND of its dominator bitset against the bitset of assigned
+# rows. The bitsets are rebuilt a chunk of rows at a time on every layer rather than kept
+# for all rows, which would take n^2 / 8 bytes - fronts here have only a few layers
+def layer_ranks(points, chunk_size=1024):
+    """ Pareto layer of every row of an (n, d) array, 1 being the pareto front """
+    unique, inverse = np.unique(
+        np.asarray(points, dtype=np.float64), axis=0, return_inverse=True
+    )
+    index = build_index(unique)
+    ranks = np.zeros(len(unique), dtype=np.int32)
+    assigned = np.zeros(len(unique), dtype=bool)
+    remaining = np.arange(len(unique))
+    layer = 0
+    while len(remaining):
+        layer += 1
+        assigned_bits = np.packbits(assigned[index["order"]])
+        free = np.concatenate(
+            [
+                ~(
+                    dominator_bit_rows(index, unique[rows], rows) & ~assigned_bits
+                ).any(axis=1)
+                for rows in (
+                    remaining[start : start + chunk_size]
+                    for start in range(0, len(remaining), chunk_size)
+                )
+            ]
+        )
+        ranks[remaining[free]] = layer
+        assigned[remaining[free]] = True
+        remaining = remaining[~free]
+    return ranks[inverse.ravel()]
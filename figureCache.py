@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+# Finished figure payloads (PNG bytes, Plotly JSON) keyed by plot kind and axis tuple.
+# Every session shares the cache, so a view that was drawn once is served without
+# touching matplotlib or Plotly again. The cache is bounded by bytes and evicts the
+# least recently used payloads first
+_cache = OrderedDict()
+_cache_state = {"max_bytes": 64 * 2**20, "bytes": 0, "hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def configure(max_bytes):
+    """ Set the cache size limit """
+    with _lock:
+        _cache_state["max_bytes"] = max_bytes
+        evict()
+    return
+
+
+def cache_info():
+    """ Hit/miss counters and current size of the figure cache """
+    with _lock:
+        info = dict(_cache_state)
+        info["entries"] = len(_cache)
+    return info
+
+
+def evict():
+    """ Drop least recently used payloads until the cache fits its size limit """
+    while _cache and _cache_state["bytes"] > _cache_state["max_bytes"]:
+        _, payload = _cache.popitem(last=False)
+        _cache_state["bytes"] -= len(payload)
+    return
+
+
+def get_figure(key, render):
+    """ Cached payload for key, calling render() to build it on a miss """
+    with _lock:
+        if key in _cache:
+            _cache_state["hits"] += 1
+            _cache.move_to_end(key)
+            return _cache[key]
+        _cache_state["misses"] += 1
+    # Render outside the lock - two sessions asking for the same new view at once both
+    # render it, and the second payload simply replaces the first
+    payload = render()
+    with _lock:
+        if key in _cache:
+            _cache_state["bytes"] -= len(_cache.pop(key))
+        _cache[key] = payload
+        _cache_state["bytes"] += len(payload)
+        evict()
+    return payload
@@ -0,0 +1,95 @@
+import numpy as np
+import dominanceIndex
+from computeParetoPoints import unique_rows, pareto_mask
+
+
+# Approximate fronts - points are binned into boxes of side epsilon and only the boxes
+# that no other box dominates are kept, each by its single best point. Every point of the
+# full front then has a kept point that is worse by at most epsilon in any criterion
+def epsilon_front(points, epsilon):
+    """ Positions into points of one representative per non-dominated epsilon box """
+    points = np.asarray(points, dtype=np.float64)
+    boxes, box_of = unique_rows(np.floor(points / epsilon))
+    kept = pareto_mask(boxes)
+    # Within a box, keep the point with the highest total (ties go to the first point)
+    order = np.lexsort((np.arange(len(points)), -points.sum(axis=1), box_of))
+    first = order[np.r_[True, box_of[order][1:] != box_of[order][:-1]]]
+    return np.sort(first[kept[box_of[first]]])
+
+
+def hypervolume_2d(points, reference):
+    """ Exact area dominated by points above reference """
+    order = np.lexsort((-points[:, 1], -points[:, 0]))
+    x, y = points[order, 0] - reference[0], points[order, 1] - reference[1]
+    # Walking from the largest x down, each point adds the strip above the best y so far
+    best = np.maximum.accumulate(np.r_[0.0, y])
+    return float(np.sum(x * np.maximum(y - best[:-1], 0)))
+
+
+def hypervolume_3d(points, reference):
+    """ Exact volume dominated by points above reference, as a sweep of 2D slices """
+    levels = np.unique(points[:, 2])[::-1]
+    bottoms = np.r_[levels[1:], reference[2]]
+    volume = 0.0
+    for level, bottom in zip(levels, bottoms):
+        slab = points[points[:, 2] >= level]
+        volume += hypervolume_2d(slab[:, :2], reference[:2]) * (level - bottom)
+    return volume
+
+
+def hypervolume(points, reference, samples=20000, seed=0):
+    """ Volume dominated by points above reference, and its standard error """
+    # Exact up to 3 criteria, otherwise estimated by sampling the box between the
+    # reference and the best value of each criterion. A fixed seed lets two fronts be
+    # compared on the same samples
+    points = np.asarray(points, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)
+    points = points[(points > reference).all(axis=1)]
+    if len(points) == 0:
+        return 0.0, 0.0
+    if points.shape[1] == 1:
+        return float(points.max() - reference[0]), 0.0
+    if points.shape[1] == 2:
+        return hypervolume_2d(points, reference), 0.0
+    if points.shape[1] == 3:
+        return hypervolume_3d(points, reference), 0.0
+    upper = points.max(axis=0)
+    box = float(np.prod(upper - reference))
+    rng = np.random.default_rng(seed)
+    sample = reference + rng.random((samples, points.shape[1])) * (upper - reference)
+    hits = dominanceIndex.count_dominators(dominanceIndex.build_index(points), sample)
+    share = np.mean(hits > 0)
+    return box * share, box * np.sqrt(share * (1 - share) / samples)
+
+
+def coverage(a, b):
+    """ Share of the points of b that some point of a is at least as good as """
+    hits = dominanceIndex.count_dominators(dominanceIndex.build_index(a), b)
+    return float(np.mean(hits > 0))
+
+
+def additive_epsilon(a, b, chunk_size=256):
+    """ Smallest epsilon by which a has to be shifted up to cover every point of b """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    worst = -np.inf
+    for start in range(0, len(b), chunk_size):
+        gaps = (b[start : start + chunk_size, None, :] - a[None, :, :]).max(axis=2)
+        worst = max(worst, gaps.min(axis=1).max())
+    return float(max(worst, 0.0))
+
+
+def front_quality(approximate, exact, reference, samples=20000, seed=0):
+    """ Indicators of how well an approximate front stands in for the exact one """
+    exact_volume, exact_error = hypervolume(exact, reference, samples, seed)
+    volume, error = hypervolume(approximate, reference, samples, seed)
+    return {
+        "points": len(approximate),
+        "exact_points": len(exact),
+        "hypervolume": float(volume),
+        "exact_hypervolume": float(exact_volume),
+        "hypervolume_ratio": float(volume / exact_volume) if exact_volume else 1.0,
+        "hypervolume_error": float(max(error, exact_error)),
+        "coverage": coverage(approximate, exact),
+        "additive_epsilon": additive_epsilon(approximate, exact),
+    }
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+import frontStore
+import frontQuality
+import resultCache
+from dataContext import get_context
+from computeParetoPoints import (
+    front_rows,
+    factorized_front_rows,
+    part_matrices,
+    canonical_key,
+    front_name,
+    CRITERIA,
+)
+
+# Fronts come from the export store when it was computed from the current part table,
+# and otherwise from the persistent result cache, which culls and saves any front it does
+# not hold yet. Fronts in use are also kept in a byte-bounded LRU cache in memory. Every
+# cache is keyed by the content key of the data, so a patched part table never sees a
+# stale front. Sessions and the warm-up thread share the cache, so it is only touched
+# under the lock - fronts are loaded outside it, like figureCache renders its payloads
+_cache = OrderedDict()
+_cache_state = {
+    "max_bytes": 64 * 2**20,
+    "bytes": 0,
+    "hits": 0,
+    "store_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+}
+_lock = threading.Lock()
+
+
+def configure(max_bytes=None, cache_path=None):
+    """ Set the in-memory cache size limit and the persistent cache directory """
+    if cache_path is not None:
+        resultCache.configure(cache_path)
+    with _lock:
+        if max_bytes is not None:
+            _cache_state["max_bytes"] = max_bytes
+        evict()
+    return
+
+
+def cache_info():
+    """ Hit/miss counters and current size of the front cache """
+    with _lock:
+        info = dict(_cache_state)
+        info["entries"] = len(_cache)
+    return info
+
+
+def clear():
+    """ Empty the in-memory front and approximation caches """
+    with _lock:
+        _cache.clear()
+        _cache_state["bytes"] = 0
+    approximate_front.cache_clear()
+    return
+
+
+def count(event):
+    with _lock:
+        _cache_state[event] += 1
+
+
+def evict():
+    """ Drop least recently used fronts until the cache fits its size limit """
+    while _cache and _cache_state["bytes"] > _cache_state["max_bytes"]:
+        _, (coords, rows) = _cache.popitem(last=False)
+        _cache_state["bytes"] -= coords.nbytes + rows.nbytes
+    return
+
+
+def get_matrix_columns(key):
+    """ Float stats matrix restricted to the given criteria """
+    return get_context()["matrix"][:, [CRITERIA.index(choice) for choice in key]]
+
+
+def cull_front(key):
+    """ Front for a canonical key, computed from the part table in the context """
+    count("misses")
+    if len(key) <= 3:
+        # The 2D and 3D sweeps over the full product beat folding the part groups
+        coords, rows = front_rows(get_matrix_columns(key))
+    else:
+        coords, rows = factorized_front_rows(part_matrices(get_context()["parts"], key))
+    return {"coords": coords, "rows": rows}
+
+
+def load_front(key):
+    """ Front for a canonical key from the export store or the persistent cache """
+    # Every front here is under plain stat dominance, with unique float coordinates. The
+    # stored 13D front breaks stat ties by part name for the kart selection page, so it
+    # is never served as a criteria subset
+    context = get_context()
+    if len(key) in context["store"] and len(key) < len(CRITERIA):
+        count("store_hits")
+        coords, rows = frontStore.read_front(key, store=context["store"])
+        return np.asarray(coords, dtype=np.float64), np.asarray(rows)
+    entry = resultCache.load(context["key"], front_name(key))
+    if entry is None:
+        entry = cull_front(key)
+        resultCache.save(context["key"], front_name(key), entry)
+    else:
+        count("disk_hits")
+    return entry["coords"], entry["rows"]
+
+
+def get_front(*criteria):
+    """ Unique optimal coordinates (in canonical criteria order) and stats row ids """
+    key = (get_context()["key"], canonical_key(*criteria))
+    with _lock:
+        if key in _cache:
+            _cache_state["hits"] += 1
+            _cache.move_to_end(key)
+            return _cache[key]
+    # Two threads missing on the same front both load it, and the second replaces the
+    # first without counting its bytes twice
+    coords, rows = load_front(key[1])
+    with _lock:
+        if key in _cache:
+            old_coords, old_rows = _cache.pop(key)
+            _cache_state["bytes"] -= old_coords.nbytes + old_rows.nbytes
+        _cache[key] = (coords, rows)
+        _cache_state["bytes"] += coords.nbytes + rows.nbytes
+        evict()
+    return coords, rows
+
+
+@lru_cache(maxsize=64)
+def approximate_front(content, key, epsilon):
+    """ Rows of the epsilon-box approximation of a front and its quality indicators """
+    # content is the context's content key, so patched data never reuses old results
+    coords, rows = get_front(*key)
+    points = get_matrix_columns(key)
+    kept = rows[frontQuality.epsilon_front(points[rows], epsilon)]
+    # Indicators are measured against the exact front, above the worst combination
+    quality = frontQuality.front_quality(points[kept], coords, points.min(axis=0))
+    return kept, quality
+
+
+def get_approximate_front(*criteria, epsilon):
+    """ Approximate front rows for any criteria order, and how much it gives up """
+    return approximate_front(get_context()["key"], canonical_key(*criteria), epsilon)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import itertools as it
+from functools import lru_cache
+import numpy as np
+import profiling
+
+STORE_PATH = "fronts"
+PARTS_FILE = "parts.csv"
+RANKS_FILE = "ranks.npy"
+ARRAYS = ("coords", "coord_offsets", "rows", "row_offsets")
+# Part of every content key - bump it whenever a change to the culls changes any front
+ALGORITHM_VERSION = 2
+
+
+# Layout: for each number of criteria d the store holds
+#   {d}d_coords.npy         (total, d) pareto optimal coordinates of every front
+#   {d}d_coord_offsets.npy  int64 (combinations + 1) slice bounds into {d}d_coords
+#   {d}d_rows.npy           int32 stats row ids of the optimal combinations of every front
+#   {d}d_row_offsets.npy    int64 (combinations + 1) slice bounds into {d}d_rows
+# The 13D front is stored as row ids only, its coordinates being the stats rows themselves.
+# A front's id is its position in it.combinations(criteria, d), and index.json records the
+# criteria order, the numbers of criteria stored and the content key of the part table
+# and criteria the fronts were computed from, and the type of each coordinate array - the
+# smallest of int8, int16 and float32 that holds the coordinates exactly (float64 if
+# none does), so a custom part table with fractional or large stats still exports.
+# parts.csv keeps the part table the
+# fronts were computed from, so a balance patch can be diffed against it. ranks.npy holds
+# the 13D pareto layer of every stats row (1 being the 13D front) as uint8 or uint16
+def content_key(parts, criteria):
+    """ Hash of a part table, the criteria and the algorithm version """
+    digest = hashlib.sha256(parts.to_csv().encode())
+    digest.update(json.dumps([list(criteria), ALGORITHM_VERSION]).encode())
+    return digest.hexdigest()[:16]
+
+
+def store_key(path=STORE_PATH):
+    """ Content key the stored fronts were computed from, or None without a store """
+    try:
+        with open(os.path.join(path, "index.json")) as f:
+            return json.load(f).get("key")
+    except FileNotFoundError:
+        return None
+
+
+def offsets(chunks):
+    """ Slice bounds for a list of arrays laid end to end """
+    return np.concatenate(([0], np.cumsum([len(chunk) for chunk in chunks])))
+
+
+def coord_dtype(coords):
+    """ Smallest type that holds every coordinate exactly """
+    if (coords == np.round(coords)).all():
+        for dtype in (np.int8, np.int16):
+            info = np.iinfo(dtype)
+            if ((coords >= info.min) & (coords <= info.max)).all():
+                return np.dtype(dtype)
+    if (coords.astype(np.float32) == coords).all():
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def save_array(file_path, array):
+    """ Save an array by replacing the file, so existing memory maps keep the old data """
+    with open(file_path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(file_path + ".tmp", file_path)
+
+
+def write_store(fronts, criteria, path=STORE_PATH, parts=None):
+    """ Write {dim: {combination: (coords, rows)}} as memory-mappable arrays """
+    os.makedirs(path, exist_ok=True)
+    if parts is not None:
+        parts.to_csv(os.path.join(path, PARTS_FILE))
+    dtypes = {}
+    for dim, dim_fronts in fronts.items():
+        combos = list(it.combinations(criteria, dim))
+        coords = [np.asarray(dim_fronts[combo][0]).reshape(-1, dim) for combo in combos]
+        rows = [np.asarray(dim_fronts[combo][1]) for combo in combos]
+        all_coords = np.concatenate(coords)
+        dtypes[str(dim)] = coord_dtype(all_coords).name
+        arrays = {
+            "coords": all_coords.astype(dtypes[str(dim)]),
+            "coord_offsets": offsets(coords).astype(np.int64),
+            "rows": np.concatenate(rows).astype(np.int32),
+            "row_offsets": offsets(rows).astype(np.int64),
+        }
+        for name, array in arrays.items():
+            save_array(os.path.join(path, f"{dim}d_{name}.npy"), array)
+
+    index_path = os.path.join(path, "index.json")
+    key = content_key(parts, criteria) if parts is not None else store_key(path)
+    dims = set(fronts)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        # Fronts computed from other data are no longer part of the store
+        if index["criteria"] == list(criteria) and index.get("key") == key:
+            dims |= set(index["dims"])
+            dtypes = {**index.get("coord_dtypes", {}), **dtypes}
+    with open(index_path, "w") as f:
+        json.dump(
+            {
+                "criteria": list(criteria),
+                "dims": sorted(dims),
+                "key": key,
+                "coord_dtypes": {
+                    str(dim): dtypes[str(dim)]
+                    for dim in sorted(dims)
+                    if str(dim) in dtypes
+                },
+            },
+            f,
+            indent=2,
+        )
+    open_store.cache_clear()
+    return
+
+
+def write_ranks(ranks, path=STORE_PATH):
+    """ Write the per-row pareto layers in the smallest unsigned type that holds them """
+    os.makedirs(path, exist_ok=True)
+    dtype = np.uint8 if ranks.max() <= np.iinfo(np.uint8).max else np.uint16
+    save_array(os.path.join(path, RANKS_FILE), ranks.astype(dtype))
+    return
+
+
+def read_ranks(path=STORE_PATH):
+    """ Memory mapped per-row pareto layers """
+    ranks = np.load(os.path.join(path, RANKS_FILE), mmap_mode="r")
+    profiling.add_bytes(ranks.nbytes)
+    return ranks
+
+
+@lru_cache(maxsize=None)
+def open_store(path=STORE_PATH, key=None):
+    """ Memory map the store - nothing is read from disk until a front is sliced """
+    # With a content key, a store computed from other data opens as an empty store
+    with open(os.path.join(path, "index.json")) as f:
+        index = json.load(f)
+    store = {}
+    if key is not None and index.get("key") != key:
+        return store
+    for dim in index["dims"]:
+        store[dim] = {
+            name: np.load(os.path.join(path, f"{dim}d_{name}.npy"), mmap_mode="r")
+            for name in ARRAYS
+        }
+        store[dim]["ids"] = {
+            combo: i for i, combo in enumerate(it.combinations(index["criteria"], dim))
+        }
+    return store
+
+
+def read_front(combo, path=STORE_PATH, store=None):
+    """ Coordinates and stats row ids of the front for a canonical criteria tuple """
+    # Both are views into the memory map, so only the pages of this front are read
+    dim_store = (open_store(path) if store is None else store)[len(combo)]
+    i = dim_store["ids"][tuple(combo)]
+    coord_start, coord_end = dim_store["coord_offsets"][i : i + 2]
+    row_start, row_end = dim_store["row_offsets"][i : i + 2]
+    coords = dim_store["coords"][coord_start:coord_end]
+    rows = dim_store["rows"][row_start:row_end]
+    profiling.add_bytes(coords.nbytes + rows.nbytes)
+    return coords, rows
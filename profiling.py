@@ -0,0 +1,196 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+
+ENV_VAR = "MK8_PROFILE"
+LOG_ENV_VAR = "MK8_PROFILE_LOG"
+QUERY_PARAM = "profile"
+
+logger = logging.getLogger("mk8.profile")
+# Streamlit runs each session's reruns on its own thread, so every thread keeps the
+# record of the rerun it is running. No record means profiling is off and the wrappers
+# below only forward the call. Streamlit is only imported by the functions that read the
+# page or draw on it, so the exporter, its workers and the batch API run without it
+_local = threading.local()
+
+
+def current():
+    """ Record of the rerun running on this thread, or None when profiling is off """
+    return getattr(_local, "record", None)
+
+
+def requested():
+    """ Whether the env var or the page's query params switch profiling on """
+    if os.environ.get(ENV_VAR, "") not in ("", "0"):
+        return True
+    import streamlit as st
+
+    return QUERY_PARAM in st.experimental_get_query_params()
+
+
+def session_id():
+    import streamlit as st
+
+    if "profile_session" not in st.session_state:
+        st.session_state["profile_session"] = uuid.uuid4().hex[:12]
+    return st.session_state["profile_session"]
+
+
+def start_rerun():
+    """ Start recording this rerun if profiling is switched on """
+    _local.record = None
+    if requested():
+        _local.record = {
+            "session": session_id(),
+            "start": time.perf_counter(),
+            "functions": {},
+            "caches": {},
+            "bytes_read": 0,
+        }
+    return
+
+
+def add_function_time(name, elapsed):
+    record = current()
+    if record is not None:
+        calls, total = record["functions"].get(name, (0, 0.0))
+        record["functions"][name] = (calls + 1, total + elapsed)
+
+
+def add_bytes(count):
+    """ Count bytes read from disk towards the current rerun """
+    record = current()
+    if record is not None:
+        record["bytes_read"] += int(count)
+
+
+def count_cache(name, event):
+    record = current()
+    if record is not None:
+        counts = record["caches"].setdefault(name, {"calls": 0, "misses": 0})
+        counts[event] += 1
+
+
+def timed(func):
+    """ Record the (inclusive) wall time of every call made while profiling is on """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current() is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            add_function_time(func.__name__, time.perf_counter() - start)
+
+    return wrapper
+
+
+def cached(cache):
+    """ Apply a caching decorator such as st.cache, counting its calls and misses """
+
+    # Calls are counted outside the cache and misses inside it, where the body only
+    # runs when the cache had no entry
+    def decorate(func):
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            count_cache(func.__name__, "misses")
+            return func(*args, **kwargs)
+
+        cached_func = cache(compute)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            count_cache(func.__name__, "calls")
+            return cached_func(*args, **kwargs)
+
+        timed_wrapper = timed(wrapper)
+        if hasattr(cached_func, "cache_clear"):
+            timed_wrapper.cache_clear = cached_func.cache_clear
+        return timed_wrapper
+
+    return decorate
+
+
+def get_logger():
+    """ Profiling logger, writing one JSON line per rerun to MK8_PROFILE_LOG or stderr """
+    if not logger.handlers:
+        log_path = os.environ.get(LOG_ENV_VAR)
+        handler = logging.FileHandler(log_path) if log_path else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def finish_rerun(page, extra_caches=None):
+    """ Close the current rerun record and log it as one JSON line """
+    record = current()
+    if record is None:
+        return None
+    record["total_s"] = time.perf_counter() - record.pop("start")
+    record["page"] = page
+    record["extra_caches"] = extra_caches or {}
+    get_logger().info(
+        json.dumps(
+            {
+                "event": "rerun",
+                "time": time.time(),
+                "session": record["session"],
+                "page": page,
+                "total_s": round(record["total_s"], 6),
+                "bytes_read": record["bytes_read"],
+                "functions": {
+                    name: {"calls": calls, "total_s": round(total, 6)}
+                    for name, (calls, total) in record["functions"].items()
+                },
+                "caches": record["caches"],
+                "extra_caches": record["extra_caches"],
+            }
+        )
+    )
+    return record
+
+
+def show_panel(record):
+    """ Sidebar panel with the timings, cache counts and bytes read of a rerun """
+    if record is None:
+        return
+    import streamlit as st
+
+    with st.sidebar.expander("Profiling", expanded=True):
+        st.write(
+            f"Rerun took {record['total_s'] * 1000:.1f} ms and read "
+            f"{record['bytes_read'] / 1024:.1f} KiB"
+        )
+        functions = pd.DataFrame(
+            [
+                (name, calls, total * 1000)
+                for name, (calls, total) in record["functions"].items()
+            ],
+            columns=["Function", "Calls", "Total (ms)"],
+        ).sort_values("Total (ms)", ascending=False)
+        st.dataframe(functions.reset_index(drop=True))
+        caches = pd.DataFrame(
+            [
+                (
+                    name,
+                    counts["calls"],
+                    counts["calls"] - counts["misses"],
+                    counts["misses"],
+                )
+                for name, counts in record["caches"].items()
+            ],
+            columns=["Loader", "Calls", "Hits", "Misses"],
+        )
+        st.dataframe(caches)
+        for name, info in record["extra_caches"].items():
+            st.write(f"{name}: {info}")
+    return
@@ -0,0 +1,60 @@
+import os
+import threading
+import zipfile
+import numpy as np
+
+CACHE_ENV_VAR = "MK8_CACHE_PATH"
+
+# Persistent cache of computed results, shared by the app servers and the export jobs.
+# Entries live under a directory named by the content key of the data they were computed
+# from (see frontStore.content_key), so a changed part table, criteria list or algorithm
+# simply reads from a new directory and nothing stale is ever served. Entries are written
+# to a temporary file and renamed into place, so processes sharing the directory never
+# see a partial entry
+_settings = {
+    "path": os.environ.get(
+        CACHE_ENV_VAR, os.path.join(os.path.expanduser("~"), ".cache", "mk8-pareto")
+    )
+}
+
+
+def configure(path):
+    """ Set the cache directory """
+    _settings["path"] = path
+    return
+
+
+def entry_path(key, name):
+    return os.path.join(_settings["path"], key, f"{name}.npz")
+
+
+def load(key, name):
+    """ Arrays of a cache entry, or None if it is missing or unreadable """
+    try:
+        with np.load(entry_path(key, name)) as entry:
+            return {array: entry[array] for array in entry.files}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+        # A damaged entry is rebuilt like a missing one
+        return None
+
+
+def save(key, name, arrays):
+    """ Write a cache entry atomically """
+    file_path = entry_path(key, name)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = f"{file_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temp_path, file_path)
+    return
+
+
+def get_or_build(key, name, build):
+    """ Arrays of a cache entry, calling build() and saving its result on a miss """
+    entry = load(key, name)
+    if entry is None:
+        entry = build()
+        save(key, name, entry)
+    return entry
@@ -0,0 +1,80 @@
+import numpy as np
+from computeParetoPoints import CRITERIA
+
+
+# Weighted-score and constraint queries over the combination matrix. Each criterion
+# keeps its rows sorted by value, so a bound is a binary search that yields the matching
+# rows directly; only the rows that pass the most selective bound are scored
+def build_query_index(points):
+    """ Stats matrix plus, per criterion, the row order and values sorted ascending """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    order = np.argsort(points, axis=0, kind="stable").T
+    return {
+        "points": points,
+        "order": order,
+        "sorted": np.take_along_axis(points, order.T, axis=0).T,
+    }
+
+
+def bound_rows(index, criterion, low=None, high=None):
+    """ Row ids with low <= criterion <= high, from the sorted criterion index """
+    j = CRITERIA.index(criterion)
+    values = index["sorted"][j]
+    start = 0 if low is None else np.searchsorted(values, low, side="left")
+    end = len(values) if high is None else np.searchsorted(values, high, side="right")
+    return index["order"][j][start:end]
+
+
+def query(index, weights=None, bounds=None, k=10):
+    """ Top-k rows by weighted score among those inside every (low, high) bound """
+    # weights and bounds are keyed by criterion name, and a None end leaves a bound
+    # open. Returns the row ids, their scores and the number of rows inside the bounds
+    points = index["points"]
+    bounds = {
+        criterion: (low, high)
+        for criterion, (low, high) in (bounds or {}).items()
+        if low is not None or high is not None
+    }
+    if bounds:
+        # Seed with the most selective bound, then check the others on its rows only
+        seeds = {
+            criterion: bound_rows(index, criterion, low, high)
+            for criterion, (low, high) in bounds.items()
+        }
+        seed = min(seeds, key=lambda criterion: len(seeds[criterion]))
+        rows = np.sort(seeds[seed])
+        for criterion, (low, high) in bounds.items():
+            if criterion == seed:
+                continue
+            column = points[rows, CRITERIA.index(criterion)]
+            inside = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                inside &= column >= low
+            if high is not None:
+                inside &= column <= high
+            rows = rows[inside]
+    else:
+        rows = np.arange(len(points))
+
+    matched = len(rows)
+    weight_vector = np.zeros(len(CRITERIA))
+    for criterion, weight in (weights or {}).items():
+        weight_vector[CRITERIA.index(criterion)] = weight
+    scores = points[rows] @ weight_vector
+
+    if matched > k:
+        # Keep everything tied with the k-th best score so ties break on row id
+        kth = np.partition(scores, matched - k)[matched - k]
+        best = scores >= kth
+        rows, scores = rows[best], scores[best]
+    top = np.lexsort((rows, -scores))[:k]
+    return rows[top], scores[top], matched
+
+
+def window(index, rows, sort=None, descending=True, start=0, size=25):
+    """ Positions into rows of one page, sorted on a criterion (ties keep rows' order) """
+    positions = np.arange(len(rows))
+    if sort is not None:
+        values = index["points"][rows, CRITERIA.index(sort)]
+        positions = np.argsort(-values if descending else values, kind="stable")
+    return positions[start : start + size]
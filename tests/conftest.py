@@ -0,0 +1,96 @@
+import os
+import shutil
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+sys.path.insert(0, REPO_PATH)
+
+import computeParetoPoints  # noqa: E402
+import dataContext  # noqa: E402
+import frontService  # noqa: E402
+import frontStore  # noqa: E402
+import resultCache  # noqa: E402
+
+
+# Kernels are checked against an O(n^2) comparison of all pairs of rows. Points are
+# drawn from a few small integers so that ties and repeated rows are common
+def random_points(rng, n, d, high=5):
+    return rng.integers(0, high, size=(n, d)).astype(np.float64)
+
+
+def brute_dominated(points, others):
+    """ Mask of the rows of points that some row of others dominates """
+    at_least = (others[None, :, :] >= points[:, None, :]).all(axis=2)
+    better = (others[None, :, :] > points[:, None, :]).any(axis=2)
+    return (at_least & better).any(axis=1)
+
+
+def brute_front(points):
+    """ Rows of points that no other row dominates (repeated rows all stay) """
+    return np.flatnonzero(~brute_dominated(points, points))
+
+
+def random_parts(rng, d):
+    """ Four part groups of one to eight rows each """
+    return [random_points(rng, n, d, high=4) for n in rng.integers(1, 9, size=4)]
+
+
+def product_points(parts):
+    """ Every sum of one row from each part matrix, in it.product order """
+    codes = np.indices([len(part) for part in parts]).reshape(len(parts), -1)
+    return sum(part[code] for part, code in zip(parts, codes))
+
+
+def patch_parts(patch, path="MK8Data.csv"):
+    """ Apply a balance patch to the part table on disk """
+    parts = pd.read_csv(path, index_col="Names")
+    if patch == "class":
+        # Every twin of one class
+        twins = parts.index[(parts == parts.loc["Baby Peach"]).all(axis=1)]
+        parts.loc[twins, "Ground Speed"] += 12
+    elif patch == "single":
+        # One part splits off from its class
+        parts.loc["Baby Daisy", "Ground Speed"] += 5
+    elif patch == "kart":
+        parts.loc["Standard Kart", "Mini-Turbo"] += 4
+    parts.to_csv(path)
+    return
+
+
+def reset_caches():
+    """ Forget every per-process cache of the part table, the store and the fronts """
+    computeParetoPoints.get_stats.cache_clear()
+    frontStore.open_store.cache_clear()
+    frontService.clear()
+    dataContext._state.update(context=None, signature=None)
+    return
+
+
+@pytest.fixture
+def repo(monkeypatch, tmp_path):
+    """ Run in the repository, with the result cache in a temporary directory """
+    monkeypatch.chdir(REPO_PATH)
+    monkeypatch.setitem(resultCache._settings, "path", str(tmp_path / "cache"))
+    monkeypatch.setenv(resultCache.CACHE_ENV_VAR, str(tmp_path / "cache"))
+    reset_caches()
+    yield REPO_PATH
+    reset_caches()
+
+
+@pytest.fixture
+def scratch(monkeypatch, tmp_path):
+    """ Run in a temporary copy of the part table and the front store """
+    shutil.copy(os.path.join(REPO_PATH, "MK8Data.csv"), tmp_path)
+    shutil.copytree(
+        os.path.join(REPO_PATH, frontStore.STORE_PATH), tmp_path / frontStore.STORE_PATH
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(resultCache._settings, "path", str(tmp_path / "cache"))
+    monkeypatch.setenv(resultCache.CACHE_ENV_VAR, str(tmp_path / "cache"))
+    reset_caches()
+    yield tmp_path
+    reset_caches()
@@ -0,0 +1,82 @@
+import itertools as it
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import computeParetoPoints
+import dominanceIndex
+import frontStore
+from computeParetoPoints import CRITERIA, NAMES, canonical_key
+from conftest import DATA_PATH, REPO_PATH
+
+# The CSVs the original simple culls exported (2dCoords.csv, 3dCoords.csv, AllCoords.csv),
+# kept gzipped under tests/data. Every exporter has to reproduce the same fronts
+
+
+def baseline_coords(dim):
+    """ {canonical key: unique front coordinates} from a baseline nD coordinate CSV """
+    coords = pd.read_csv(os.path.join(DATA_PATH, f"{dim}dCoords.csv.gz"))
+    labels = [f"Coord{i + 1}" for i in range(dim)]
+    fronts = {}
+    for combo, group in coords.groupby(labels, sort=False):
+        key = canonical_key(*combo)
+        fronts[key] = np.unique(group[list(key)].to_numpy(dtype=np.float64), axis=0)
+    return fronts
+
+
+def baseline_loadouts():
+    """ Part names of every combination on the baseline 13D front """
+    loadouts = pd.read_csv(os.path.join(DATA_PATH, "AllCoords.csv.gz"), index_col=0)
+    return set(loadouts[NAMES].itertuples(index=False, name=None))
+
+
+@pytest.fixture(scope="module", params=["serial", "streaming"])
+def exported(request, tmp_path_factory):
+    """ Front store written from the repository's part table by one of the exporters """
+    path = str(tmp_path_factory.mktemp("fronts"))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(REPO_PATH)
+        computeParetoPoints.get_stats.cache_clear()
+        if request.param == "serial":
+            computeParetoPoints.export_2d(path)
+            computeParetoPoints.export_3d(path)
+            computeParetoPoints.export_13d(path)
+        else:
+            # Blocks much smaller than the product, so fronts are merged across blocks
+            computeParetoPoints.export_streaming(chunk_size=1500, path=path)
+        stats = computeParetoPoints.get_stats()
+    computeParetoPoints.get_stats.cache_clear()
+    return path, stats
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+def test_export_reproduces_baseline(exported, dim):
+    path, _ = exported
+    fronts = baseline_coords(dim)
+    assert set(fronts) == set(it.combinations(CRITERIA, dim))
+    for key, expected in fronts.items():
+        coords, _ = frontStore.read_front(key, path)
+        assert np.array_equal(np.asarray(coords, dtype=np.float64), expected), key
+
+
+def test_export_reproduces_baseline_13d(exported):
+    path, stats = exported
+    _, rows = frontStore.read_front(tuple(CRITERIA), path)
+    loadouts = list(
+        stats.iloc[rows][NAMES].astype(str).itertuples(index=False, name=None)
+    )
+    assert len(loadouts) == len(set(loadouts))
+    assert set(loadouts) == baseline_loadouts()
+
+
+def test_export_writes_ranks(exported):
+    path, stats = exported
+    expected = dominanceIndex.layer_ranks(computeParetoPoints.get_matrix(stats))
+    assert np.array_equal(frontStore.read_ranks(path), expected)
+
+
+@pytest.mark.parametrize("dim", [2, 3])
+def test_store_matches_baseline(repo, dim):
+    for key, expected in baseline_coords(dim).items():
+        coords, _ = frontStore.read_front(key)
+        assert np.array_equal(np.asarray(coords, dtype=np.float64), expected), key
@@ -0,0 +1,150 @@
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import pytest
+import batchQuery
+import warmup
+from computeParetoPoints import NAMES
+from dataContext import get_context
+
+
+def all_loadouts():
+    return get_context()["stats"][NAMES].astype(str).reset_index(drop=True)
+
+
+def test_evaluate_matches_pareto(repo):
+    context = get_context()
+    results = batchQuery.evaluate(all_loadouts())
+    assert [result["row"] for result in results] == list(range(len(context["matrix"])))
+    pareto = np.array([result["pareto"] for result in results])
+    counts = np.array([result["dominated_by"] for result in results])
+    assert np.array_equal(pareto, counts == 0)
+    assert np.array_equal(pareto, context["pareto"])
+
+    # Dominator counts and the best dominators against a comparison of all pairs
+    ranked = context["ranked"]
+    totals = ranked.sum(axis=1)
+    loadouts = all_loadouts()
+    for row in np.random.default_rng(0).choice(len(ranked), size=25, replace=False):
+        dominators = np.flatnonzero(
+            (ranked >= ranked[row]).all(axis=1) & (ranked > ranked[row]).any(axis=1)
+        )
+        assert counts[row] == len(dominators)
+        (result,) = batchQuery.evaluate(loadouts.iloc[[row]], dominators=3)
+        best = dominators[np.lexsort((dominators, -totals[dominators]))][:3]
+        expected = loadouts.iloc[best].values.tolist()
+        assert result.get("dominators", []) == expected
+
+
+def test_evaluate_names(repo):
+    loadouts = pd.DataFrame(
+        [
+            ["Baby Peach", "Standard Kart", "Standard", "Super Glider"],
+            [" Baby Daisy ", "Standard Kart", "Standard", "Super Glider"],
+            ["Nobody", "Standard Kart", "Standard", "Nothing"],
+        ],
+        columns=NAMES,
+    )
+    first, twin, unknown = batchQuery.evaluate(loadouts, stats=True)
+    # Parts with the same stats share a row
+    assert twin["row"] == first["row"]
+    assert twin["Weight"] == first["Weight"]
+    assert unknown["error"] == "Unknown Character, Glider"
+
+
+@pytest.mark.parametrize("value", [-2, 2.5, "-1", "x", "", True, None])
+def test_parse_count_rejects(value):
+    with pytest.raises(ValueError):
+        batchQuery.parse_count(value, "dominators")
+
+
+@pytest.mark.parametrize(
+    "value, expected", [(0, 0), (3, 3), ("5", 5), (np.int64(2), 2)]
+)
+def test_parse_count(value, expected):
+    assert batchQuery.parse_count(value, "dominators") == expected
+
+
+def request(url, body=None, content_type="application/json"):
+    """ Status and JSON body of a GET (or, with a body, POST) request """
+    data = None if body is None else body.encode()
+    req = urllib.request.Request(url, data, {"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+@pytest.fixture
+def server(repo):
+    warmup.start(("context",))
+    assert warmup.wait(60)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), batchQuery.QueryHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_http_api(server):
+    status, body = request(server + "/health")
+    assert status == 200 and body["combinations"] == len(get_context()["matrix"])
+
+    loadout = dict(zip(NAMES, ["Mario", "Standard Kart", "Slick", "Cloud Glider"]))
+    status, body = request(
+        server + "/evaluate", json.dumps({"loadouts": [loadout], "dominators": 2})
+    )
+    assert status == 200
+    assert len(body["results"][0]["dominators"]) == 2
+    assert body["results"] == batchQuery.evaluate(pd.DataFrame([loadout]), 2)
+
+    csv = ",".join(NAMES) + "\n" + ",".join(loadout.values()) + "\n"
+    status, body = request(server + "/evaluate?dominators=2", csv, "text/csv")
+    assert status == 200
+    assert body["results"] == batchQuery.evaluate(pd.DataFrame([loadout]), 2)
+
+    for dominators in (-2, 1.5, "many"):
+        status, body = request(
+            server + "/evaluate",
+            json.dumps({"loadouts": [loadout], "dominators": dominators}),
+        )
+        assert status == 400 and "dominators" in body["error"]
+    status, _ = request(server + "/evaluate?dominators=-2", csv, "text/csv")
+    assert status == 400
+    status, _ = request(server + "/evaluate", json.dumps({}))
+    assert status == 400
+    status, _ = request(server + "/missing")
+    assert status == 404
+
+
+def test_http_request_parsing(server):
+    loadout = dict(zip(NAMES, ["Mario", "Standard Kart", "Slick", "Cloud Glider"]))
+    csv = ",".join(NAMES) + "\n" + ",".join(loadout.values()) + "\n"
+    # Query params are URL-decoded
+    status, body = request(
+        server + "/evaluate?dominators=%32&stats=%74rue", csv, "text/csv"
+    )
+    assert status == 200
+    assert body["results"] == batchQuery.evaluate(pd.DataFrame([loadout]), 2, True)
+
+    # A malformed or negative Content-Length is answered with a 400, not a dropped
+    # connection
+    host, port = server[len("http://") :].split(":")
+    for length in ("abc", "-5"):
+        connection = http.client.HTTPConnection(host, int(port), timeout=10)
+        connection.putrequest("POST", "/evaluate")
+        connection.putheader("Content-Type", "text/csv")
+        connection.putheader("Content-Length", length)
+        connection.endheaders()
+        connection.send(csv.encode())
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "error" in json.load(response)
+        connection.close()
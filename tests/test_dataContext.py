@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import dataContext
+import dominanceIndex
+import frontService
+import frontStore
+from computeParetoPoints import CRITERIA, front_rows
+from conftest import REPO_PATH, patch_parts
+
+
+def test_context_matches_store(repo):
+    context = dataContext.get_context()
+    assert context["store_current"]
+    ranked = context["ranked"]
+    assert np.array_equal(context["ranks"], dominanceIndex.layer_ranks(ranked))
+    _, rows = frontStore.read_front(tuple(CRITERIA), store=context["store"])
+    assert np.array_equal(rows, front_rows(ranked)[1])
+    for combo in (("Weight", "Ground Speed"), ("Weight", "Acceleration", "Mini-Turbo")):
+        coords, rows = frontService.get_front(*combo)
+        expected_coords, expected_rows = front_rows(
+            frontService.get_matrix_columns(combo)
+        )
+        assert coords.dtype == np.float64
+        assert np.array_equal(coords, expected_coords)
+        assert np.array_equal(rows, expected_rows)
+    # Nothing in the shared context can be written to
+    assert not context["matrix"].flags.writeable
+    assert dataContext.get_context() is context
+
+
+def test_stale_store_after_reexport(scratch):
+    # A patch is exported by another process while this one holds the old store open,
+    # as when the fronts are rebuilt next to a running app. Once the context reloads,
+    # the fronts served must be those of the new part table and not the memory maps
+    # that were opened for the old one
+    combo = ("Weight", "Ground Speed")
+    assert dataContext.get_context()["store_current"]
+    old_coords, _ = frontService.get_front(*combo)
+
+    patch_parts("class")
+    subprocess.run(
+        [sys.executable, os.path.join(REPO_PATH, "computeParetoPoints.py"), "--serial"],
+        cwd=scratch,
+        check=True,
+        capture_output=True,
+    )
+    context = dataContext.get_context()
+    assert context["store_current"]
+    assert context["key"] == frontStore.store_key()
+    expected = front_rows(frontService.get_matrix_columns(combo))
+    # The patch gives the front a second point
+    assert len(expected[0]) > len(old_coords)
+    coords, rows = frontService.get_front(*combo)
+    assert np.array_equal(coords, expected[0])
+    assert np.array_equal(rows, expected[1])
+    assert np.array_equal(
+        context["ranks"], dominanceIndex.layer_ranks(context["ranked"])
+    )
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import dominanceIndex
+from conftest import brute_front, random_points
+
+SEEDS = range(12)
+
+
+def brute_layers(points):
+    """ Pareto layer of every row, by peeling off one front at a time """
+    ranks = np.zeros(len(points), dtype=np.int64)
+    remaining = np.arange(len(points))
+    layer = 0
+    while len(remaining):
+        layer += 1
+        front = remaining[brute_front(points[remaining])]
+        ranks[front] = layer
+        remaining = np.setdiff1d(remaining, front)
+    return ranks
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("d", [2, 5])
+def test_dominator_queries(seed, d):
+    rng = np.random.default_rng(seed)
+    points = random_points(rng, 300, d)
+    index = dominanceIndex.build_index(points)
+    queries = np.concatenate([points[:40], random_points(rng, 40, d)])
+    exclude = np.concatenate([np.arange(40), np.full(40, -1)])
+    at_least = (points[None, :, :] >= queries[:, None, :]).all(axis=2)
+    at_least[np.arange(40), np.arange(40)] = False
+
+    counts = dominanceIndex.count_dominators(index, queries[:40], exclude[:40])
+    assert np.array_equal(counts, at_least[:40].sum(axis=1))
+    counts = dominanceIndex.count_dominators(index, queries[40:], chunk_size=6)
+    assert np.array_equal(counts, at_least[40:].sum(axis=1))
+
+    # The k best dominators are the ones with the highest totals, ties in row order
+    best_first = np.argsort(-points.sum(axis=1), kind="stable")
+    for i, (point, row) in enumerate(zip(queries, exclude)):
+        for k in (1, 5, 1000):
+            count, top = dominanceIndex.query_dominators(
+                index, point, k, None if row < 0 else row
+            )
+            assert count == at_least[i].sum()
+            assert np.array_equal(top, best_first[at_least[i][best_first]][:k])
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("d", [2, 3, 5])
+def test_layer_ranks(seed, d):
+    points = random_points(np.random.default_rng(seed), 250, d)
+    expected = brute_layers(points)
+    # Enough layers that later ones depend on rows assigned from other chunks
+    assert expected.max() >= 3
+    assert np.array_equal(dominanceIndex.layer_ranks(points), expected)
+    for chunk_size in (1, 9):
+        assert np.array_equal(
+            dominanceIndex.layer_ranks(points, chunk_size=chunk_size), expected
+        )
@@ -0,0 +1,21 @@
+import os
+import numpy as np
+import computeParetoPoints
+import frontStore
+from conftest import REPO_PATH
+
+
+def test_export_parallel(scratch, capsys):
+    timings = computeParetoPoints.export_parallel(max_workers=2, force=True)
+    assert len(timings) == 365
+    assert "Culled 365 combinations" in capsys.readouterr().out
+    # Same fronts, layers and index as the checked-in store
+    for name in sorted(os.listdir(os.path.join(REPO_PATH, frontStore.STORE_PATH))):
+        if name.endswith(".npy"):
+            expected = np.load(os.path.join(REPO_PATH, frontStore.STORE_PATH, name))
+            assert np.array_equal(
+                np.load(os.path.join(frontStore.STORE_PATH, name)), expected
+            ), name
+
+    # An up to date store is left alone
+    assert computeParetoPoints.export_parallel(max_workers=2) == {}
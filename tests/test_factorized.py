@@ -0,0 +1,14 @@
+import numpy as np
+import pytest
+from computeParetoPoints import factorized_front_rows, front_rows
+from conftest import product_points, random_parts
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("d", [2, 3, 4, 7])
+def test_factorized_front_rows(seed, d):
+    parts = random_parts(np.random.default_rng(seed), d)
+    coords, rows = front_rows(product_points(parts))
+    factorized_coords, factorized = factorized_front_rows(parts)
+    assert np.array_equal(factorized, rows)
+    assert np.array_equal(factorized_coords, coords)
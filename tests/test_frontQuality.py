@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import frontQuality
+from computeParetoPoints import front_rows
+from conftest import random_points
+
+SEEDS = range(12)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_epsilon_front(seed):
+    rng = np.random.default_rng(seed)
+    points = random_points(rng, 400, 3, high=20)
+    coords, rows = front_rows(points)
+    for epsilon in (1, 2, 5):
+        kept = rows[frontQuality.epsilon_front(points[rows], epsilon)]
+        assert set(kept) <= set(rows)
+        assert frontQuality.additive_epsilon(points[kept], coords) < epsilon
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_exact_hypervolume(seed):
+    rng = np.random.default_rng(seed)
+    for d in (2, 3):
+        points = random_points(rng, 30, d, high=6) + 1
+        # Count the unit cells above the origin that some point covers
+        cells = np.indices([6] * d).reshape(d, -1).T + 1
+        covered = (points[None, :, :] >= cells[:, None, :]).all(axis=2).any(axis=1)
+        volume, error = frontQuality.hypervolume(points, np.zeros(d))
+        assert volume == covered.sum()
+        assert error == 0
@@ -0,0 +1,83 @@
+import itertools as it
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import computeParetoPoints
+import frontStore
+from computeParetoPoints import CRITERIA, front_rows, get_matrix, get_stats
+
+
+def random_fronts(rng, criteria, dims, low=-127, high=128):
+    return {
+        dim: {
+            combo: (
+                rng.integers(low, high, size=(rng.integers(0, 20), dim)),
+                rng.integers(0, 10000, size=rng.integers(0, 30)),
+            )
+            for combo in it.combinations(criteria, dim)
+        }
+        for dim in dims
+    }
+
+
+def test_store_round_trip(tmp_path):
+    criteria = ["a", "b", "c", "d"]
+    fronts = random_fronts(np.random.default_rng(0), criteria, (2, 3))
+    parts = pd.DataFrame({"a": [1, 2]}, index=["x", "y"])
+    frontStore.write_store(fronts, criteria, str(tmp_path), parts)
+    assert frontStore.store_key(str(tmp_path)) == frontStore.content_key(
+        parts, criteria
+    )
+    for dim, dim_fronts in fronts.items():
+        for combo, (coords, rows) in dim_fronts.items():
+            stored_coords, stored_rows = frontStore.read_front(combo, str(tmp_path))
+            assert np.array_equal(stored_coords, coords)
+            assert np.array_equal(stored_rows, rows)
+
+    # A store computed from other data opens empty
+    assert frontStore.open_store(str(tmp_path), key="0" * 16) == {}
+
+    ranks = np.array([1, 2, 300, 1])
+    frontStore.write_ranks(ranks, str(tmp_path))
+    assert np.array_equal(frontStore.read_ranks(str(tmp_path)), ranks)
+
+
+@pytest.mark.parametrize(
+    "coords, dtype",
+    [
+        ([[-128, 127]], "int8"),
+        ([[0, 128]], "int16"),
+        ([[-32768, 300]], "int16"),
+        ([[0.5, 40000]], "float32"),
+        ([[0.1, 1]], "float64"),
+    ],
+)
+def test_coordinate_types(tmp_path, coords, dtype):
+    criteria = ["a", "b"]
+    frontStore.write_store({2: {("a", "b"): (coords, [0])}}, criteria, str(tmp_path))
+    stored, _ = frontStore.read_front(("a", "b"), str(tmp_path))
+    assert stored.dtype == dtype
+    assert np.array_equal(stored, coords)
+    with open(tmp_path / "index.json") as f:
+        assert json.load(f)["coord_dtypes"] == {"2": dtype}
+
+
+def test_export_custom_stats(scratch):
+    # A modded part table with fractional stats and sums well past int8
+    parts = pd.read_csv("MK8Data.csv", index_col="Names")
+    parts["Weight"] *= 20
+    parts.loc["Mario", "Ground Speed"] += 0.25
+    parts.to_csv("MK8Data.csv")
+    computeParetoPoints.export_2d()
+    computeParetoPoints.export_3d()
+    matrix = get_matrix(get_stats())
+    for combo in (("Weight", "Ground Speed"), ("Weight", "Acceleration", "Air Speed")):
+        coords, rows = frontStore.read_front(combo)
+        expected_coords, expected_rows = front_rows(
+            matrix[:, [CRITERIA.index(choice) for choice in combo]]
+        )
+        assert np.array_equal(coords, expected_coords)
+        assert np.array_equal(rows, expected_rows)
+    with open("fronts/index.json") as f:
+        assert json.load(f)["coord_dtypes"]["2"] == "float32"
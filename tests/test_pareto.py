@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from computeParetoPoints import (
+    dominated_by,
+    front_rows,
+    pareto_mask,
+    pareto_mask_2d,
+    pareto_mask_3d,
+    unique_rows,
+)
+from conftest import brute_dominated, brute_front, random_points
+
+SEEDS = range(12)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("d", [1, 2, 3, 4, 6])
+def test_unique_rows(seed, d):
+    points = random_points(np.random.default_rng(seed), 200, d)
+    unique, inverse = unique_rows(points)
+    expected, expected_inverse = np.unique(points, axis=0, return_inverse=True)
+    assert np.array_equal(unique, expected)
+    assert np.array_equal(inverse, expected_inverse.ravel())
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("d", [1, 2, 3, 4, 6])
+def test_pareto_mask(seed, d):
+    rng = np.random.default_rng(seed)
+    unique, _ = unique_rows(random_points(rng, rng.integers(1, 300), d))
+    expected = np.zeros(len(unique), dtype=bool)
+    expected[brute_front(unique)] = True
+    assert np.array_equal(pareto_mask(unique), expected)
+    # Blocks smaller than the front exercise the front found so far
+    assert np.array_equal(pareto_mask(unique, block_size=7), expected)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_pareto_mask_2d_3d(seed):
+    rng = np.random.default_rng(seed)
+    for d, kernel in ((2, pareto_mask_2d), (3, pareto_mask_3d)):
+        unique, _ = unique_rows(random_points(rng, rng.integers(1, 400), d, high=12))
+        expected = np.zeros(len(unique), dtype=bool)
+        expected[brute_front(unique)] = True
+        assert np.array_equal(kernel(unique), expected)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("d", [2, 3, 5])
+def test_front_rows(seed, d):
+    points = random_points(np.random.default_rng(seed), 300, d)
+    coords, rows = front_rows(points)
+    expected = brute_front(points)
+    assert np.array_equal(rows, expected)
+    assert np.array_equal(coords, np.unique(points[expected], axis=0))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("d", [2, 3, 5])
+def test_dominated_by(seed, d):
+    rng = np.random.default_rng(seed)
+    points, others = random_points(rng, 150, d), random_points(rng, 90, d)
+    expected = brute_dominated(points, others)
+    assert np.array_equal(dominated_by(points, others), expected)
+    assert np.array_equal(dominated_by(points, others, block_size=5), expected)
+    assert not dominated_by(points, others[:0]).any()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import statQuery
+from computeParetoPoints import CRITERIA
+from conftest import random_points
+
+SEEDS = range(12)
+
+
+def brute_query(points, weights, bounds, k):
+    inside = np.ones(len(points), dtype=bool)
+    for criterion, (low, high) in bounds.items():
+        column = points[:, CRITERIA.index(criterion)]
+        if low is not None:
+            inside &= column >= low
+        if high is not None:
+            inside &= column <= high
+    rows = np.flatnonzero(inside)
+    weight_vector = np.zeros(len(CRITERIA))
+    for criterion, weight in weights.items():
+        weight_vector[CRITERIA.index(criterion)] = weight
+    scores = points[rows] @ weight_vector
+    ranked = sorted(zip(-scores, rows))[:k]
+    return [row for _, row in ranked], [-score for score, _ in ranked], len(rows)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_stat_query(seed):
+    rng = np.random.default_rng(seed)
+    points = random_points(rng, 500, len(CRITERIA), high=8)
+    index = statQuery.build_query_index(points)
+    for _ in range(10):
+        criteria = rng.choice(CRITERIA, size=3, replace=False)
+        weights = {criterion: float(rng.integers(-2, 4)) for criterion in criteria}
+        bounds = {}
+        for criterion in rng.choice(CRITERIA, size=rng.integers(0, 4), replace=False):
+            low, high = sorted(rng.integers(0, 8, size=2))
+            bounds[criterion] = (
+                None if rng.random() < 0.3 else low,
+                None if rng.random() < 0.3 else high,
+            )
+        k = int(rng.integers(1, 40))
+        rows, scores, matched = statQuery.query(index, weights, bounds, k)
+        expected_rows, expected_scores, expected_matched = brute_query(
+            points, weights, bounds, k
+        )
+        assert matched == expected_matched
+        assert rows.tolist() == expected_rows
+        assert np.allclose(scores, expected_scores)
+
+    for criterion in CRITERIA:
+        column = points[:, CRITERIA.index(criterion)]
+        rows = statQuery.bound_rows(index, criterion, 2, 5)
+        assert np.array_equal(
+            np.sort(rows), np.flatnonzero((column >= 2) & (column <= 5))
+        )
+        assert len(statQuery.bound_rows(index, criterion)) == len(points)
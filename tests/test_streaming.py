@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from computeParetoPoints import front_rows, stat_chunks, streaming_front_rows
+from conftest import product_points, random_parts
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 2**16])
+def test_streaming_front_rows(seed, chunk_size):
+    parts = random_parts(np.random.default_rng(seed), 4)
+    points = product_points(parts)
+    chunks = list(stat_chunks(parts, chunk_size))
+    assert np.array_equal(
+        np.concatenate([rows for rows, _ in chunks]), np.arange(len(points))
+    )
+    assert np.array_equal(np.concatenate([block for _, block in chunks]), points)
+    coords, rows = front_rows(points)
+    streamed_coords, streamed = streaming_front_rows(parts, chunk_size)
+    assert np.array_equal(streamed, rows)
+    assert np.array_equal(streamed_coords, coords)
+
+
+def test_empty_part_group():
+    parts = random_parts(np.random.default_rng(0), 3)
+    parts[2] = parts[2][:0]
+    for chunk_size in (1, 2**16):
+        coords, rows = streaming_front_rows(parts, chunk_size)
+        assert coords.shape == (0, 3)
+        assert len(rows) == 0
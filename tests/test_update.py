@@ -0,0 +1,36 @@
+import itertools as it
+import numpy as np
+import pytest
+import computeParetoPoints
+import dominanceIndex
+import frontStore
+from computeParetoPoints import (
+    CRITERIA,
+    build_stats,
+    front_rows,
+    get_matrix,
+    read_parts,
+)
+from conftest import patch_parts
+
+
+@pytest.mark.parametrize("patch", ["class", "single", "kart"])
+def test_update_fronts(scratch, patch, capsys):
+    patch_parts(patch)
+    computeParetoPoints.update_fronts()
+    assert "Patched" in capsys.readouterr().out
+
+    parts = read_parts("MK8Data.csv")
+    assert frontStore.store_key() == frontStore.content_key(parts, CRITERIA)
+    matrix = get_matrix(build_stats(parts))
+    for dim in (2, 3):
+        for combo in it.combinations(CRITERIA, dim):
+            coords, rows = frontStore.read_front(combo)
+            expected_coords, expected_rows = front_rows(
+                matrix[:, [CRITERIA.index(choice) for choice in combo]]
+            )
+            assert np.array_equal(coords, expected_coords), combo
+            assert np.array_equal(rows, expected_rows), combo
+    _, rows = frontStore.read_front(tuple(CRITERIA))
+    assert np.array_equal(rows, front_rows(matrix)[1])
+    assert np.array_equal(frontStore.read_ranks(), dominanceIndex.layer_ranks(matrix))
@@ -0,0 +1,125 @@
+import importlib
+import itertools as it
+import json
+import os
+import threading
+import time
+import profiling
+
+# Axes the Optimize by Stats page opens with
+DEFAULT_AXES = ("Weight", "Acceleration", "On-road Traction")
+
+
+# Cold start - Streamlit only runs app.py inside a session, so the first session to open
+# starts one background thread per process that loads the data context, the default
+# fronts and the plotting libraries, in order. Until the stages a page needs have run,
+# the page shows their progress and reruns instead of loading them itself, so nothing is
+# done twice and later sessions find everything loaded. A failed stage is left to the
+# page that needs it, which raises the error properly
+def load_context():
+    """ Shared data context with its indexes """
+    from dataContext import get_context
+
+    get_context()
+
+
+def load_fronts():
+    """ Fronts of the default axes """
+    import frontService
+
+    for pair in it.combinations(DEFAULT_AXES, 2):
+        frontService.get_front(*pair)
+    frontService.get_front(*DEFAULT_AXES)
+
+
+def import_plotting():
+    """ matplotlib and Plotly, which the pages import lazily """
+    for module in ("matplotlib.figure", "plotly.graph_objects"):
+        importlib.import_module(module)
+
+
+def render_figures():
+    """ Figure payloads of the default axes """
+    import dataManipulation
+
+    for pair in it.combinations(DEFAULT_AXES, 2):
+        dataManipulation.figure_2d(*pair)
+    dataManipulation.figure_3d(*DEFAULT_AXES)
+
+
+STAGES = {
+    "context": load_context,
+    "fronts": load_fronts,
+    "plotting": import_plotting,
+    "figures": render_figures,
+}
+
+_state = {"thread": None, "stages": {}}
+_lock = threading.Lock()
+
+
+def run(stages):
+    """ Run the warm-up stages in order, recording the state and duration of each """
+    for name in stages:
+        _state["stages"][name]["state"] = "running"
+        start = time.perf_counter()
+        try:
+            STAGES[name]()
+        except Exception as error:
+            # A failed stage is left to the page that needs it, which raises it properly
+            _state["stages"][name].update(state="failed", error=repr(error))
+        else:
+            _state["stages"][name]["state"] = "done"
+        _state["stages"][name]["seconds"] = round(time.perf_counter() - start, 6)
+    if os.environ.get(profiling.ENV_VAR, "") not in ("", "0"):
+        profiling.get_logger().info(
+            json.dumps({"event": "warmup", "time": time.time(), **status()})
+        )
+    return
+
+
+def start(stages=tuple(STAGES)):
+    """ Start the warm-up thread, once per process """
+    with _lock:
+        if _state["thread"] is None:
+            _state["stages"] = {name: {"state": "pending"} for name in stages}
+            _state["thread"] = threading.Thread(
+                target=run, args=(stages,), name="mk8-warmup", daemon=True
+            )
+            _state["thread"].start()
+    return
+
+
+def status():
+    """ Readiness of the process and the state of every warm-up stage """
+    stages = {name: dict(stage) for name, stage in _state["stages"].items()}
+    return {
+        "ready": bool(stages)
+        and all(stage["state"] in ("done", "failed") for stage in stages.values()),
+        "stages": stages,
+    }
+
+
+def ready(stage=None):
+    """ Whether the warm-up (or one stage of it) has finished """
+    if stage is None:
+        return status()["ready"]
+    return _state["stages"].get(stage, {}).get("state") == "done"
+
+
+def pending(*stages):
+    """ The given stages (or all of them) that have not finished yet """
+    states = {name: stage["state"] for name, stage in _state["stages"].items()}
+    return [
+        name
+        for name in stages or tuple(states)
+        if states.get(name) in ("pending", "running")
+    ]
+
+
+def wait(timeout=None):
+    """ Block until the warm-up thread has finished """
+    thread = _state["thread"]
+    if thread is not None:
+        thread.join(timeout)
+    return status()["ready"]